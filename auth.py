@@ -1,9 +1,10 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from jose import JWTError, jwt
 from typing import Optional
-import crud, models, database, utils, schemas
+import cache, crud, crud_async, hashing, models, database, utils, schemas
 import os
 from dotenv import load_dotenv
 
@@ -24,31 +25,58 @@ def authenticate_user(db: Session, username: str, password: str):
     user = crud.get_user_by_username(db, username=username)
     if not user:
         return False
-    if not utils.verify_password(password, user.password_hash):
+    if not hashing.verify_password(password, user.password_hash):
         return False
     return user
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+def _username_from_token(token: str) -> str:
     try:
         # Use our verify_token utility which handles both access and refresh tokens
         payload = utils.verify_token(token, is_refresh=False)
-        username: str | None = payload.get("sub")
-        if not username:
-            raise credentials_exception
-            
-        user = crud.get_user_by_username(db, username=username)
-        if user is None:
-            raise credentials_exception
-        return user
-    except HTTPException as e:
+    except HTTPException:
         # Re-raise HTTP exceptions (like expired token)
-        raise e
-    except Exception as e:
+        raise
+    except Exception:
         # Catch any other exceptions and return 401
-        raise credentials_exception
+        raise _credentials_exception()
+    username: str | None = payload.get("sub")
+    if not username:
+        raise _credentials_exception()
+    return username
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(database.get_db)):
+    username = _username_from_token(token)
+    user = cache.user_cache.get(username)
+    if user is not None:
+        return user
+    try:
+        user = crud.get_user_by_username(db, username=username)
+    except Exception:
+        raise _credentials_exception()
+    return _cache_principal(username, user)
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(database.get_async_db)):
+    username = _username_from_token(token)
+    user = cache.user_cache.get(username)
+    if user is not None:
+        return user
+    try:
+        user = await crud_async.get_user_by_username(db, username=username)
+    except Exception:
+        raise _credentials_exception()
+    return _cache_principal(username, user)
+
+def _cache_principal(username: str, user: Optional[models.User]) -> schemas.UserResponse:
+    if user is None:
+        raise _credentials_exception()
+    # a detached snapshot is safe to share between requests and sessions
+    principal = schemas.UserResponse.model_validate(user)
+    cache.user_cache.set(username, principal)
+    return principal
@@ -0,0 +1,137 @@
+"""
+Load-test comparison of the sync (threadpool) and async (AsyncSession) request paths.
+
+Starts the app under uvicorn once per mode against the same database, seeds
+one user with some debts, then drives GET /api/debts/ and GET /api/monitoring/
+at a fixed concurrency and reports throughput and latency for each mode.
+
+Usage:
+    python benchmarks/bench_async.py [--database-url URL] [--concurrency 64] [--duration 10]
+
+With no --database-url a temporary SQLite file is used (aiosqlite in async
+mode); point it at Postgres to compare psycopg2 against asyncpg.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def upgrade_database(database_url):
+    """Bring the benchmark database to the latest migration, as a deployment would"""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("sqlalchemy.url", database_url)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+
+def start_server(database_url, async_mode, port):
+    env = dict(os.environ, DATABASE_URL=database_url, DB_ASYNC=str(async_mode))
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/", timeout=1)
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+
+async def seed(base, username, debts):
+    async with httpx.AsyncClient(base_url=base) as c:
+        await c.post("/api/auth/register", json={"username": username, "password": "benchpass"})
+        r = await c.post("/api/auth/login", json={"username": username, "password": "benchpass"})
+        headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+        for i in range(debts):
+            await c.post("/api/debts/", headers=headers, json={
+                "debt_type": "owed_to" if i % 2 else "owed_by",
+                "person_name": f"person{i % 50}",
+                "amount": i + 1,
+                "currency": ("UZS", "USD")[i % 2],
+            })
+        return headers
+
+
+async def drive(base, headers, concurrency, duration):
+    paths = ["/api/debts/?limit=50", "/api/monitoring/"]
+    latencies, errors = [], 0
+    stop = time.perf_counter() + duration
+
+    async def worker(n):
+        nonlocal errors
+        async with httpx.AsyncClient(base_url=base, headers=headers, timeout=10) as c:
+            i = n
+            while time.perf_counter() < stop:
+                start = time.perf_counter()
+                try:
+                    r = await c.get(paths[i % len(paths)])
+                    ok = r.status_code == 200
+                except httpx.TransportError:
+                    # a stalled server (e.g. threadpool waiting on an exhausted pool) shows up as timeouts
+                    ok = False
+                latencies.append(time.perf_counter() - start)
+                errors += not ok
+                i += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--debts", type=int, default=200)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        upgrade_database(database_url)
+        headers = None
+        print(f"{'mode':>6} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50':>9} {'p95':>9}")
+        for async_mode in (False, True):
+            proc = start_server(database_url, async_mode, args.port)
+            try:
+                base = f"http://127.0.0.1:{args.port}"
+                if headers is None:
+                    headers = asyncio.run(seed(base, "asyncbench", args.debts))
+                res = asyncio.run(drive(base, headers, args.concurrency, args.duration))
+            finally:
+                proc.terminate()
+                proc.wait()
+            mode = "async" if async_mode else "sync"
+            print(
+                f"{mode:>6} {res['requests']:>9} {res['errors']:>7} {res['rps']:>8.1f}"
+                f" {res['p50_ms']:>7.1f}ms {res['p95_ms']:>7.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
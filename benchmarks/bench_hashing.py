@@ -0,0 +1,73 @@
+"""
+Login throughput of the password hashing worker pool.
+
+Runs hashing.verify_password from many request threads against pools of
+increasing size and reports verifications per second overall and per worker
+process, next to the inline (no pool) baseline.
+
+Usage:
+    python benchmarks/bench_hashing.py [--rounds 12] [--workers 1 2 4] [--duration 5]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run(hashing, workers, hashed, duration, threads):
+    hashing.shutdown()
+    hashing.PASSWORD_HASH_WORKERS = workers
+    hashing._slots = threading.BoundedSemaphore(threads)
+    # start the pool outside the measured window
+    hashing.verify_password("benchpass", hashed)
+
+    done = 0
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def loop():
+        nonlocal done
+        while time.perf_counter() < stop:
+            assert hashing.verify_password("benchpass", hashed)
+            with lock:
+                done += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        for _ in range(threads):
+            pool.submit(loop)
+    elapsed = time.perf_counter() - start
+    hashing.shutdown()
+    return done / elapsed
+
+
+def main():
+    cores = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, max(cores // 2, 1), cores}))
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--threads", type=int, default=32, help="concurrent request threads")
+    args = parser.parse_args()
+
+    # the spawned workers read the cost factor from the environment as well
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    import hashing, utils
+
+    hashed = utils.get_password_hash("benchpass")
+    print(f"bcrypt rounds={args.rounds}, {cores} core(s), {args.threads} request threads")
+    print(f"{'workers':>8} {'verify/s':>10} {'per worker':>11} {'ms/verify':>10}")
+    for workers in [0] + args.workers:
+        rate = run(hashing, workers, hashed, args.duration, args.threads)
+        per = rate / max(workers, 1)
+        label = "inline" if workers == 0 else str(workers)
+        print(f"{label:>8} {rate:>10.1f} {per:>11.1f} {1000 / per:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
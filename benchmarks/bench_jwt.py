@@ -0,0 +1,51 @@
+"""
+Microbenchmark of utils.verify_token with and without the verified-token cache.
+
+Usage:
+    python benchmarks/bench_jwt.py [--iterations 20000]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import cache, utils
+
+
+def bench(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=20000)
+    args = parser.parse_args()
+
+    token = utils.create_access_token({"sub": "bench"}, timedelta(minutes=30))
+
+    def uncached():
+        cache.token_cache.clear()
+        utils.verify_token(token)
+
+    def cached():
+        utils.verify_token(token)
+
+    clear_only = bench(cache.token_cache.clear, args.iterations)
+    cold = bench(uncached, args.iterations) - clear_only
+    utils.verify_token(token)
+    warm = bench(cached, args.iterations)
+
+    print(f"{'uncached':>10} {cold * 1e6:>8.1f}us/verify")
+    print(f"{'cached':>10} {warm * 1e6:>8.1f}us/verify")
+    print(f"{'speedup':>10} {cold / warm:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
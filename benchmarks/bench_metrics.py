@@ -0,0 +1,75 @@
+"""
+Overhead of MetricsMiddleware on the request hot path.
+
+Serves a trivial route through a bare FastAPI app with and without the
+middleware (in-process ASGI, no network) and reports the per-request
+difference, plus the cost of one /metrics render.
+
+Usage:
+    python benchmarks/bench_metrics.py [--requests 5000] [--routes 30]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+from fastapi import FastAPI
+
+import metrics
+
+
+def build_app(instrumented: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping/{item_id}")
+    async def ping(item_id: int):
+        return {"id": item_id}
+
+    if instrumented:
+        app.add_middleware(metrics.MetricsMiddleware)
+    return app
+
+
+async def run(app, requests):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(200):
+            await client.get(f"/ping/{i}")
+        start = time.perf_counter()
+        for i in range(requests):
+            await client.get(f"/ping/{i}")
+        return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--routes", type=int, default=30, help="distinct route templates in the registry for render()")
+    args = parser.parse_args()
+
+    plain = asyncio.run(run(build_app(False), args.requests))
+    metrics.registry.reset()
+    instrumented = asyncio.run(run(build_app(True), args.requests))
+
+    print(f"without middleware: {plain * 1e6:8.1f} us/request")
+    print(f"with middleware:    {instrumented * 1e6:8.1f} us/request")
+    print(f"overhead:           {(instrumented - plain) * 1e6:8.1f} us/request ({(instrumented / plain - 1) * 100:.1f}%)")
+
+    for r in range(args.routes):
+        for status in (200, 404):
+            metrics.registry.started()
+            metrics.registry.finished("GET", f"/route/{r}", status, 0.01)
+    iterations = 200
+    start = time.perf_counter()
+    for _ in range(iterations):
+        metrics.render()
+    print(f"render ({args.routes} routes): {(time.perf_counter() - start) / iterations * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark for crud.get_monitoring_summary.
+
+Compares three ways of building the per-currency summary: the original
+implementation that loaded every Debt row and summed it in Python, a SQL
+GROUP BY over the debts table, and the maintained user_balances table that
+get_monitoring_summary reads today.
+
+Usage:
+    python benchmarks/bench_monitoring.py [--sizes 1000 10000 100000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import crud, models
+from database import Base
+
+CURRENCIES = ["UZS", "USD", "EUR", "RUB"]
+
+
+def python_loop_summary(db, user_id):
+    """The previous get_monitoring_summary: one ORM object per debt."""
+    debts = db.query(models.Debt).filter(models.Debt.user_id == user_id).all()
+    summary = {}
+    for d in debts:
+        code = d.currency or "UZS"
+        if code not in summary:
+            summary[code] = {"owed_to": 0, "owed_by": 0}
+        try:
+            amt = int(d.amount) if d.amount is not None else 0
+        except (ValueError, TypeError):
+            amt = 0
+        if d.debt_type == models.DebtType.owed_to:
+            summary[code]["owed_to"] += amt
+        else:
+            summary[code]["owed_by"] += amt
+    return [
+        {
+            "currency": code,
+            "total_owed_to": vals["owed_to"],
+            "total_owed_by": vals["owed_by"],
+            "balance": vals["owed_to"] - vals["owed_by"],
+        }
+        for code, vals in summary.items()
+    ]
+
+
+def group_by_summary(db, user_id):
+    """Aggregate over the debts table (what rebuild-balances recomputes)."""
+    return [
+        {
+            "currency": r.currency,
+            "total_owed_to": r.owed_to,
+            "total_owed_by": r.owed_by,
+            "balance": r.owed_to - r.owed_by,
+        }
+        for r in crud._aggregate_debt_balances(db, user_id)
+    ]
+
+
+def seed(session_factory, n):
+    db = session_factory()
+    user = models.User(username=f"bench{n}", password_hash="x")
+    db.add(user)
+    db.flush()
+    rnd = random.Random(n)
+    rows = [
+        {
+            "user_id": user.id,
+            "debt_type": rnd.choice(list(models.DebtType)),
+            "person_name": f"person{rnd.randint(1, 500)}",
+            "amount": rnd.randint(1, 1_000_000),
+            "currency": rnd.choice(CURRENCIES),
+        }
+        for _ in range(n)
+    ]
+    db.execute(insert(models.Debt), rows)
+    db.commit()
+    user_id = user.id
+    crud.rebuild_user_balances(db, user_id)
+    db.close()
+    return user_id
+
+
+def measure(fn, session_factory, user_id, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        db = session_factory()
+        start = time.perf_counter()
+        result = fn(db, user_id)
+        timings.append(time.perf_counter() - start)
+        db.close()
+
+    # separate traced run so tracemalloc overhead does not skew the timings
+    db = session_factory()
+    tracemalloc.start()
+    fn(db, user_id)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    db.close()
+    return min(timings), peak, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        print(
+            f"{'debts':>8} {'python loop':>12} {'sql group by':>13} {'balances':>10}"
+            f" {'loop peak':>10} {'group peak':>11} {'bal peak':>9}"
+        )
+        for n in args.sizes:
+            user_id = seed(session_factory, n)
+            loop_t, loop_mem, loop_res = measure(python_loop_summary, session_factory, user_id, args.repeat)
+            sql_t, sql_mem, sql_res = measure(group_by_summary, session_factory, user_id, args.repeat)
+            bal_t, bal_mem, bal_res = measure(crud.get_monitoring_summary, session_factory, user_id, args.repeat)
+            by_currency = lambda res: sorted(res, key=lambda r: r["currency"])
+            assert by_currency(loop_res) == by_currency(sql_res) == by_currency(bal_res)
+            print(
+                f"{n:>8} {loop_t * 1000:>10.1f}ms {sql_t * 1000:>11.1f}ms {bal_t * 1000:>8.2f}ms"
+                f" {loop_mem / 1024:>8.0f}KB {sql_mem / 1024:>9.0f}KB {bal_mem / 1024:>7.0f}KB"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Per-verify latency of password hashing schemes.
+
+Each scheme is given as NAME[:key=value,...] using passlib's setting names,
+e.g. "bcrypt:rounds=10" or "argon2:time_cost=2,memory_cost=19456,parallelism=1".
+Without arguments the scheme configured through PASSWORD_SCHEMES and the
+BCRYPT_* / ARGON2_* settings is measured next to a few common alternatives.
+
+Usage:
+    python benchmarks/bench_password_schemes.py [SCHEME ...] [--iterations 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from passlib.context import CryptContext
+
+import utils
+
+DEFAULT_SCHEMES = [
+    "bcrypt:rounds=10",
+    "bcrypt:rounds=12",
+    "argon2:time_cost=2,memory_cost=19456,parallelism=1",
+    "argon2:time_cost=3,memory_cost=65536,parallelism=4",
+]
+
+
+def parse_scheme(spec):
+    name, _, params = spec.partition(":")
+    settings = {}
+    for item in filter(None, params.split(",")):
+        key, _, value = item.partition("=")
+        settings[f"{name}__{key.strip()}"] = int(value)
+    return CryptContext(schemes=[name], **settings)
+
+
+def measure(context, iterations):
+    hashed = context.hash("benchpass")
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        assert context.verify("benchpass", hashed)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return statistics.median(timings), timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("schemes", nargs="*")
+    parser.add_argument("--iterations", type=int, default=20)
+    args = parser.parse_args()
+
+    contexts = [(f"configured ({','.join(utils.PASSWORD_SCHEMES)})", utils.pwd_context)]
+    contexts += [(spec, None) for spec in (args.schemes or DEFAULT_SCHEMES)]
+
+    print(f"{'scheme':<55} {'p50':>9} {'p95':>9}")
+    for label, context in contexts:
+        try:
+            context = context or parse_scheme(label)
+            p50, p95 = measure(context, args.iterations)
+        except Exception as e:  # e.g. argon2-cffi not installed
+            print(f"{label:<55} skipped: {e}")
+            continue
+        print(f"{label:<55} {p50 * 1000:>7.1f}ms {p95 * 1000:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Latency of crud.search_debts at a large number of debts per user.
+
+Builds a migrated database (FTS5 on SQLite), inserts --debts debts for one
+user (plus a second user's debts as noise), then times ranked search
+queries of several shapes and reports p50/p95 per shape against
+--target-ms. For comparison it also times the unindexed substring scan
+that other backends fall back to.
+
+Usage:
+    python benchmarks/bench_search.py [--debts 100000] [--queries 50] [--target-ms 100]
+        [--database-url URL]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from bench_async import ROOT, upgrade_database
+
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import crud, models, schemas
+
+FIRST = ["Ali", "Alisher", "Bobur", "Dilshod", "Jasur", "Kamola", "Madina", "Nodir", "Otabek", "Sardor",
+         "Shahzod", "Sevara", "Timur", "Umid", "Zarina", "Aziz", "Botir", "Gulnora", "Islom", "Laylo"]
+LAST = ["Karimov", "Rahimov", "Tursunov", "Yusupov", "Qodirov", "Navoiy", "Ergashev", "Saidova",
+        "Aliyeva", "Xolmatov", "Nazarov", "Sobirov", "Mirzayev", "Hasanov", "Rustamov"]
+WORDS = ["kitob", "telefon", "ijara", "tushlik", "taksi", "bozor", "dori", "kompyuter", "mashina",
+         "sovg'a", "to'y", "ta'mir", "kurs", "kredit", "qarz", "uy", "bilet", "kiyim", "oziq", "benzin"]
+
+
+def seed(database_url, n, rng):
+    upgrade_database(database_url)
+    engine = create_engine(database_url)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    with Session() as db:
+        users = [
+            crud.create_user(db, schemas.UserCreate(username=f"search{i}", password="x"), password_hash="x")
+            for i in range(2)
+        ]
+        now = datetime.utcnow()
+        for user, count in ((users[0], n), (users[1], n // 4)):
+            for start in range(0, count, 10000):
+                db.execute(insert(models.Debt), [
+                    {
+                        "user_id": user.id,
+                        "debt_type": models.DebtType.owed_to,
+                        "person_name": f"{rng.choice(FIRST)} {rng.choice(LAST)}",
+                        "amount": rng.randint(1, 100000),
+                        "currency": "UZS",
+                        "description": " ".join(rng.sample(WORDS, 3)) if rng.random() < 0.7 else None,
+                        "start_date": now - timedelta(minutes=i),
+                    }
+                    for i in range(start, min(start + 10000, count))
+                ])
+                db.commit()
+    return engine, Session, users[0].id
+
+
+def time_queries(Session, user_id, queries, search):
+    latencies = []
+    with Session() as db:
+        for q in queries:
+            start = time.perf_counter()
+            search(db, user_id, q)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return statistics.median(latencies) * 1000, latencies[int(len(latencies) * 0.95)] * 1000
+
+
+def substring_scan(db, user_id, query, limit=20):
+    q = db.query(models.Debt).filter(models.Debt.user_id == user_id)
+    for w in query.lower().split():
+        q = q.filter((models.Debt.person_name.icontains(w)) | (models.Debt.description.icontains(w)))
+    return q.order_by(models.Debt.start_date.desc(), models.Debt.id.desc()).limit(limit).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--debts", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=50, help="queries per shape")
+    parser.add_argument("--target-ms", type=float, default=100.0, help="p95 target per shape")
+    parser.add_argument("--database-url", default=None, help="an empty database")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'search.db')}"
+        start = time.perf_counter()
+        engine, Session, user_id = seed(database_url, args.debts, rng)
+        print(f"seeded {args.debts} debts in {time.perf_counter() - start:.1f}s ({engine.dialect.name})")
+
+        shapes = {
+            "full name": lambda: f"{rng.choice(FIRST)} {rng.choice(LAST)}",
+            "name prefix": lambda: rng.choice(LAST)[:3],
+            "2-char prefix": lambda: rng.choice(FIRST)[:2],
+            "description word": lambda: rng.choice(WORDS),
+            "name + word": lambda: f"{rng.choice(LAST)} {rng.choice(WORDS)}",
+        }
+        print(f"{'shape':>17} {'p50':>9} {'p95':>9} {'scan p50':>9} {'target':>7}  (scan: unranked LIKE, stops at the first page)")
+        failed = False
+        for name, make in shapes.items():
+            queries = [make() for _ in range(args.queries)]
+            p50, p95 = time_queries(Session, user_id, queries, lambda db, u, q: crud.search_debts(db, u, q))
+            scan50, _ = time_queries(Session, user_id, queries[:10], substring_scan)
+            ok = p95 <= args.target_ms
+            failed |= not ok
+            print(f"{name:>17} {p50:>7.1f}ms {p95:>7.1f}ms {scan50:>7.1f}ms {'ok' if ok else 'MISS':>7}")
+        engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
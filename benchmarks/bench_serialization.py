@@ -0,0 +1,74 @@
+"""
+Serialization cost of debt lists: float amounts vs. Decimal amounts.
+
+Builds N unsaved models.Debt rows and runs them through the steps FastAPI
+takes for a response_model=List[DebtResponse] endpoint (validate from
+attributes, dump in JSON mode, json.dumps), once with the previous
+`amount: float` schema and once with the current Decimal `Amount`.
+
+Usage:
+    python benchmarks/bench_serialization.py [--sizes 100 1000 10000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from pydantic import TypeAdapter
+
+import models, schemas
+
+
+class FloatDebtResponse(schemas.DebtResponse):
+    """DebtResponse as it was before amounts became Decimal"""
+    amount: float
+
+
+def make_rows(n):
+    now = datetime.utcnow()
+    return [
+        models.Debt(
+            id=i, user_id=1, debt_type=models.DebtType.owed_to, person_name=f"person{i % 100}",
+            amount=Decimal(f"{i * 37 % 100000}.{i % 100:02d}00"), currency="USD",
+            description=None, start_date=now, due_date=None, created_at=now, updated_at=now, version=1,
+        )
+        for i in range(n)
+    ]
+
+
+def bench(adapter, rows, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        validated = adapter.validate_python(rows, from_attributes=True)
+        json.dumps(adapter.dump_python(validated, mode="json"))
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    float_adapter = TypeAdapter(List[FloatDebtResponse])
+    decimal_adapter = TypeAdapter(List[schemas.DebtResponse])
+    print(f"{'rows':>7} {'float':>10} {'decimal':>10} {'change':>8}")
+    for n in args.sizes:
+        rows = make_rows(n)
+        f = bench(float_adapter, rows, args.repeat)
+        d = bench(decimal_adapter, rows, args.repeat)
+        print(f"{n:>7} {f * 1000:>8.2f}ms {d * 1000:>8.2f}ms {(d / f - 1) * 100:>+7.1f}%")
+
+
+if __name__ == "__main__":
+    main()
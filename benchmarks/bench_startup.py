@@ -0,0 +1,78 @@
+"""
+Worker boot latency: schema creation at import vs. migrations run once.
+
+Starts --workers Python processes at the same moment, as a multi-worker
+uvicorn/gunicorn deploy does, each importing the app and timing it. The
+"create_all" mode reproduces the old main.py, which ran
+Base.metadata.create_all (a connection plus one table reflection query per
+table) in every worker at import; the "migrated" mode is the current
+import, with the schema applied beforehand by `alembic upgrade head`.
+
+Usage:
+    python benchmarks/bench_startup.py [--workers 8] [--rounds 3] [--database-url URL]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from bench_async import ROOT, upgrade_database
+
+BOOT = """
+import time
+start = time.perf_counter()
+import main
+if {create_all}:
+    import database, models
+    database.Base.metadata.create_all(bind=database.engine)
+print(time.perf_counter() - start)
+"""
+
+
+def boot_round(database_url, workers, create_all):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-c", BOOT.format(create_all=create_all)],
+            cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    times, failures = [], 0
+    for proc in procs:
+        out, err = proc.communicate()
+        if proc.returncode == 0:
+            times.append(float(out.strip().splitlines()[-1]))
+        else:
+            failures += 1
+            print(err.strip().splitlines()[-1] if err.strip() else f"exit {proc.returncode}", file=sys.stderr)
+    return times, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'startup.db')}"
+        upgrade_database(database_url)
+        print(f"{'mode':>10} {'boots':>6} {'failed':>7} {'mean':>9} {'p50':>9} {'max':>9}")
+        for mode, create_all in (("create_all", True), ("migrated", False)):
+            times, failures = [], 0
+            for _ in range(args.rounds):
+                t, f = boot_round(database_url, args.workers, create_all)
+                times += t
+                failures += f
+            print(
+                f"{mode:>10} {len(times):>6} {failures:>7} {statistics.mean(times) * 1000:>7.0f}ms"
+                f" {statistics.median(times) * 1000:>7.0f}ms {max(times) * 1000:>7.0f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
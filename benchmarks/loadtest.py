@@ -0,0 +1,239 @@
+"""
+Repeatable load test of the whole API.
+
+Seeds a database with --users users holding --debts debts each (straight
+through SQLAlchemy, so seeding does not pay for bcrypt or HTTP), starts the
+app under uvicorn against it, and drives a weighted mix of
+register / login / list / create / monitoring requests at a fixed
+concurrency. Per-endpoint p50/p95/p99 latency, throughput and error counts
+are printed as JSON so runs can be stored and compared.
+
+Usage:
+    python benchmarks/loadtest.py [--mix mixed] [--users 50] [--debts 200]
+        [--concurrency 32] [--duration 20] [--database-url URL] [--output run.json]
+
+With no --database-url a fresh temporary SQLite file is used; point it at
+an empty Postgres database for production-like numbers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from bench_async import start_server, upgrade_database
+
+# operation -> weight; each mix sums to 100
+MIXES = {
+    "read": {"list": 60, "monitoring": 30, "create": 10},
+    "write": {"create": 50, "list": 30, "monitoring": 20},
+    "auth": {"register": 20, "login": 40, "list": 40},
+    "mixed": {"register": 2, "login": 8, "list": 45, "create": 20, "monitoring": 25},
+}
+CURRENCIES = ["UZS", "USD", "EUR"]
+PASSWORD = "loadtestpass"
+
+
+def seed(database_url, users, debts, rng):
+    """Migrate the schema and insert the seed data; returns the seeded usernames"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import crud, schemas, utils
+
+    upgrade_database(database_url)
+    engine = create_engine(database_url)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    # every seeded user shares one password, so hash it once
+    password_hash = utils.get_password_hash(PASSWORD)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    usernames = []
+    with Session() as db:
+        for u in range(users):
+            username = f"load{u}"
+            user = crud.create_user(db, schemas.UserCreate(username=username, password=PASSWORD), password_hash)
+            batch = [
+                schemas.DebtCreate(
+                    debt_type=rng.choice(["owed_to", "owed_by"]),
+                    person_name=f"person{rng.randrange(100)}",
+                    amount=rng.randint(1, 1_000_000),
+                    currency=rng.choice(CURRENCIES),
+                    due_date=now + timedelta(days=rng.randint(-60, 60)) if rng.random() < 0.7 else None,
+                )
+                for _ in range(debts)
+            ]
+            crud.bulk_create_debts(db, user.id, batch)
+            usernames.append(username)
+    engine.dispose()
+    return usernames
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Runner:
+    def __init__(self, base, usernames, mix, rng):
+        import utils
+
+        self.base = base
+        self.usernames = usernames
+        self.ops, self.weights = zip(*MIXES[mix].items())
+        self.rng = rng
+        self.run_id = f"{int(time.time())}{rng.randrange(1000)}"
+        self.counter = 0
+        # authenticated traffic uses tokens minted with the server's SECRET_KEY instead of a login each
+        self.tokens = {u: utils.create_access_token({"sub": u}, timedelta(hours=2)) for u in usernames}
+        self.latencies = {op: [] for op in self.ops}
+        self.errors = {op: 0 for op in self.ops}
+        self.statuses = {op: {} for op in self.ops}
+
+    def _auth(self):
+        username = self.rng.choice(self.usernames)
+        return {"Authorization": f"Bearer {self.tokens[username]}"}
+
+    async def request(self, client, op):
+        if op == "register":
+            self.counter += 1
+            username = f"reg{self.run_id}_{self.counter}"
+            return await client.post("/api/auth/register", json={"username": username, "password": PASSWORD}), 201
+        if op == "login":
+            username = self.rng.choice(self.usernames)
+            return await client.post("/api/auth/login", json={"username": username, "password": PASSWORD}), 200
+        if op == "list":
+            params = {"limit": 50}
+            if self.rng.random() < 0.3:
+                params["currency"] = self.rng.choice(CURRENCIES)
+            return await client.get("/api/debts/", params=params, headers=self._auth()), 200
+        if op == "create":
+            return await client.post("/api/debts/", headers=self._auth(), json={
+                "debt_type": self.rng.choice(["owed_to", "owed_by"]),
+                "person_name": f"person{self.rng.randrange(100)}",
+                "amount": self.rng.randint(1, 1_000_000),
+                "currency": self.rng.choice(CURRENCIES),
+            }), 201
+        if op == "monitoring":
+            return await client.get("/api/monitoring/", headers=self._auth()), 200
+        raise ValueError(op)
+
+    async def worker(self, stop, record_after):
+        async with httpx.AsyncClient(base_url=self.base, timeout=30) as client:
+            while True:
+                now = time.perf_counter()
+                if now >= stop:
+                    return
+                op = self.rng.choices(self.ops, self.weights)[0]
+                start = time.perf_counter()
+                try:
+                    response, expected = await self.request(client, op)
+                    status = str(response.status_code)
+                    ok = response.status_code == expected
+                except httpx.TransportError:
+                    status, ok = "transport_error", False
+                if start >= record_after:
+                    self.latencies[op].append(time.perf_counter() - start)
+                    self.errors[op] += not ok
+                    self.statuses[op][status] = self.statuses[op].get(status, 0) + 1
+
+    async def run(self, concurrency, duration, warmup):
+        began = time.perf_counter()
+        record_after = began + warmup
+        stop = record_after + duration
+        await asyncio.gather(*(self.worker(stop, record_after) for _ in range(concurrency)))
+        return time.perf_counter() - record_after
+
+    def report(self, elapsed):
+        endpoints = {}
+        for op in self.ops:
+            values = sorted(self.latencies[op])
+            endpoints[op] = {
+                "requests": len(values),
+                "errors": self.errors[op],
+                "statuses": self.statuses[op],
+                "rps": round(len(values) / elapsed, 2),
+                **{
+                    f"p{p}_ms": round(percentile(values, p) * 1000, 2) if values else None
+                    for p in (50, 95, 99)
+                },
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        return {"total_requests": total, "total_rps": round(total / elapsed, 2), "endpoints": endpoints}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--debts", type=int, default=200, help="debts per seeded user")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of traffic before measuring")
+    parser.add_argument("--database-url", default=None, help="an empty database; migrations are applied")
+    parser.add_argument("--async-mode", action="store_true", help="start the server with DB_ASYNC=True")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--seed", type=int, default=1, help="random seed for data and traffic")
+    parser.add_argument("--output", default=None, help="also write the JSON report to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'loadtest.db')}"
+        os.environ["DATABASE_URL"] = database_url
+
+        seed_start = time.perf_counter()
+        usernames = seed(database_url, args.users, args.debts, rng)
+        seed_seconds = time.perf_counter() - seed_start
+
+        proc = start_server(database_url, args.async_mode, args.port)
+        try:
+            runner = Runner(f"http://127.0.0.1:{args.port}", usernames, args.mix, rng)
+            elapsed = asyncio.run(runner.run(args.concurrency, args.duration, args.warmup))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "database": database_url.split("://", 1)[0],
+        "config": {
+            "mix": args.mix, "weights": MIXES[args.mix], "users": args.users, "debts_per_user": args.debts,
+            "concurrency": args.concurrency, "duration": args.duration, "warmup": args.warmup,
+            "async_mode": args.async_mode, "seed": args.seed,
+        },
+        "seed_seconds": round(seed_seconds, 2),
+        "measured_seconds": round(elapsed, 2),
+        **runner.report(elapsed),
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Conditional GET support for the polled read endpoints.
+
+Validators come from the per-user version stamps that crud bumps in the same
+transaction as every write (crud.get_version_stamp), so checking them costs
+one primary key lookup on users. A matching If-None-Match (or, without one,
+If-Modified-Since) is answered with an empty 304 before the endpoint runs
+its queries or serializes anything.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response
+
+# clients may keep the body but must revalidate before reusing it
+CACHE_CONTROL = "private, no-cache"
+
+
+def make_etag(*parts) -> str:
+    # weak: the same version may be sent with a different Content-Encoding
+    return 'W/"' + "-".join(str(p) for p in parts) + '"'
+
+
+def http_date(dt: datetime) -> str:
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return format_datetime(dt.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # weak comparison, as RFC 9110 requires for If-None-Match
+        tags = [t.strip().removeprefix("W/") for t in if_none_match.split(",")]
+        return "*" in tags or etag.removeprefix("W/") in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP dates have whole-second precision
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
+def check(request: Request, response: Response, etag: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """
+    Set the validators on `response`, or return the 304 the endpoint should
+    send instead when the client's copy is still current.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def debts_validators(user_id: int, stamp):
+    return make_etag("debts", user_id, stamp.debts_version), stamp.debts_updated_at
+
+
+def settings_validators(user_id: int, stamp):
+    return make_etag("settings", user_id, stamp.settings_version), stamp.settings_updated_at
+
+
+def monitoring_validators(user_id: int, stamp, rates_version: str):
+    # balances follow the debts, the consolidated total also the default currency and the
+    # rates; a rates reload has no modification time, so this resource is ETag-only
+    rates_tag = hashlib.sha256(rates_version.encode()).hexdigest()[:12]
+    return make_etag("monitoring", user_id, stamp.debts_version, stamp.settings_version, rates_tag), None
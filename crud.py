@@ -1,8 +1,15 @@
+from sqlalchemy import and_, case, column, delete, func, insert, literal_column, or_, select, table, text, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
-import models, schemas, utils
-from datetime import datetime
+from typing import List, Optional, Dict, Any, Iterator, Tuple
+import cache, hashing, models, money, rates, schemas, search, utils
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
 from fastapi import HTTPException, status
+import logging
+
+logger = logging.getLogger(__name__)
 
 # --- Users ---
 def get_user_by_username(db: Session, username: str):
@@ -11,8 +18,21 @@ def get_user_by_username(db: Session, username: str):
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).filter(models.User.email == email).first()
 
-def create_user(db: Session, user_in: schemas.UserCreate):
-    hashed = utils.get_password_hash(user_in.password)
+def find_user_conflict(db: Session, username: str, email: Optional[str] = None) -> Optional[str]:
+    """Return "username" or "email" if either is already taken, checked with one query"""
+    cond = models.User.username == username
+    if email:
+        cond = or_(cond, models.User.email == email)
+    taken = db.query(models.User.username, models.User.email).filter(cond).limit(2).all()
+    if any(u == username for u, _ in taken):
+        return "username"
+    if taken:
+        return "email"
+    return None
+
+def create_user(db: Session, user_in: schemas.UserCreate, password_hash: Optional[str] = None):
+    # async callers hash up front so the worker pool is awaited, not blocked on
+    hashed = password_hash or hashing.hash_password(user_in.password)
     user_data = {
         'username': user_in.username,
         'password_hash': hashed,
@@ -25,16 +45,46 @@ def create_user(db: Session, user_in: schemas.UserCreate):
         user_data['email'] = user_in.email
     
     user = models.User(**user_data)
+    # Default settings go in with the user: one flush, one commit
+    user.settings = models.Setting(default_currency="UZS")
     db.add(user)
     db.commit()
-    db.refresh(user)
-    
-    # Create default settings
-    setting = models.Setting(user_id=user.id, default_currency="UZS")
-    db.add(setting)
+    return user
+
+def update_password_hash(db: Session, user: models.User, password_hash: str):
+    username = user.username
+    user.password_hash = password_hash
     db.commit()
+    cache.invalidate_user(username)
     return user
 
+# --- Version stamps ---
+def get_version_stamp(db: Session, user_id: int):
+    """The user's (debts_version, debts_updated_at, settings_version, settings_updated_at); a primary key lookup only"""
+    return db.execute(
+        select(
+            models.User.debts_version, models.User.debts_updated_at,
+            models.User.settings_version, models.User.settings_updated_at,
+        ).where(models.User.id == user_id)
+    ).first()
+
+def _bump_version(db: Session, kind: str, *user_ids: int) -> List[int]:
+    """Advance the "debts" or "settings" stamp of the given users in the current transaction; returns the new values"""
+    if not user_ids:
+        return []
+    version = getattr(models.User, f"{kind}_version")
+    return db.execute(
+        update(models.User)
+        .where(models.User.id.in_(user_ids))
+        .values({version: version + 1, getattr(models.User, f"{kind}_updated_at"): datetime.utcnow()})
+        .returning(version)
+    ).scalars().all()
+
+def _next_debts_version(db: Session, user_id: int) -> int:
+    # the row lock taken here is held to commit, so a user's versions commit in order. Every
+    # debt write takes it before touching user_balances or debts: one lock order, no deadlocks
+    return _bump_version(db, "debts", user_id)[0]
+
 # --- Settings ---
 def get_setting(db: Session, user_id: int):
     return db.query(models.Setting).filter(models.Setting.user_id == user_id).first()
@@ -62,10 +112,95 @@ def upsert_setting(db: Session, user_id: int, setting_in: schemas.SettingUpdate)
         if hasattr(setting_in, 'reminder_time'):
             s.reminder_time = setting_in.reminder_time
     
+    s.next_reminder_at = next_reminder_at(s)
+    _bump_version(db, "settings", user_id)
     db.commit()
-    db.refresh(s)
     return s
 
+# --- Reminders ---
+def next_reminder_at(setting: models.Setting, after: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Next occurrence (naive UTC) of the setting's daily reminder strictly after `after`.
+    
+    Only the time of day of reminder_time is used. Returns None when
+    reminders or notifications are switched off or no time is set.
+    """
+    if not (setting.reminder_enabled and setting.notifications_enabled and setting.reminder_time):
+        return None
+    at = setting.reminder_time
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    after = after or datetime.utcnow()
+    candidate = datetime.combine(after.date(), at.time())
+    if candidate <= after:
+        candidate += timedelta(days=1)
+    return candidate
+
+def get_due_reminder_settings(
+    db: Session, now: datetime, after: Optional[Tuple[datetime, int]] = None, limit: int = 500
+) -> List[models.Setting]:
+    """One page of settings whose reminder is due, keyset ordered by (next_reminder_at, user_id)"""
+    q = db.query(models.Setting).filter(
+        models.Setting.next_reminder_at.isnot(None),
+        models.Setting.next_reminder_at <= now,
+    )
+    if after:
+        q = q.filter(tuple_(models.Setting.next_reminder_at, models.Setting.user_id) > tuple_(*after))
+    return q.order_by(models.Setting.next_reminder_at, models.Setting.user_id).limit(limit).all()
+
+def get_reminder_debts(db: Session, user_ids: List[int], until: datetime) -> Dict[int, List[models.Debt]]:
+    """Debts of the given users that are overdue or due by `until`, in one query"""
+    rows = db.query(models.Debt).filter(
+        models.Debt.user_id.in_(user_ids),
+        models.Debt.due_date.isnot(None),
+        models.Debt.due_date <= until,
+    ).order_by(models.Debt.user_id, models.Debt.due_date).all()
+    debts: Dict[int, List[models.Debt]] = {}
+    for d in rows:
+        debts.setdefault(d.user_id, []).append(d)
+    return debts
+
+def claim_reminders(db: Session, claims: List[Dict[str, Any]], now: datetime) -> List[int]:
+    """
+    Record deliveries for (user_id, scheduled_for, debt_count) claims and move
+    each claimed setting to its next occurrence, in one transaction.
+    
+    Claims already present in reminder_deliveries (sent before a restart, or
+    by a concurrent scheduler) are skipped. Returns the user ids that were
+    claimed by this call and should now be sent.
+    """
+    if not claims:
+        return []
+    user_ids = [c["user_id"] for c in claims]
+    existing = set(db.query(models.ReminderDelivery.user_id, models.ReminderDelivery.scheduled_for).filter(
+        models.ReminderDelivery.user_id.in_(user_ids),
+        models.ReminderDelivery.scheduled_for.in_({c["scheduled_for"] for c in claims}),
+    ).all())
+    fresh = [c for c in claims if (c["user_id"], c["scheduled_for"]) not in existing]
+    try:
+        if fresh:
+            db.execute(insert(models.ReminderDelivery), [dict(c, sent_at=now) for c in fresh])
+    except IntegrityError:
+        # lost a race with another scheduler: fall back to one savepoint per claim
+        db.rollback()
+        won = []
+        for c in fresh:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(models.ReminderDelivery), [dict(c, sent_at=now)])
+                won.append(c)
+            except IntegrityError:
+                pass
+        fresh = won
+    settings = db.query(models.Setting).filter(models.Setting.user_id.in_(user_ids)).all()
+    if settings:
+        db.execute(update(models.Setting), [
+            {"id": s.id, "next_reminder_at": next_reminder_at(s, after=now)} for s in settings
+        ])
+        _bump_version(db, "settings", *(s.user_id for s in settings))
+    db.commit()
+    return [c["user_id"] for c in fresh]
+
 # --- Debts ---
 def create_debt(db: Session, debt_in: schemas.DebtCreate, user_id: int):
     # Create the debt with all required fields
@@ -73,7 +208,7 @@ def create_debt(db: Session, debt_in: schemas.DebtCreate, user_id: int):
         user_id=user_id,
         debt_type=debt_in.debt_type,
         person_name=debt_in.person_name,
-        amount=debt_in.amount,
+        amount=_to_amount(debt_in.amount),
         currency=debt_in.currency,
         description=debt_in.description,
         due_date=debt_in.due_date,
@@ -81,34 +216,99 @@ def create_debt(db: Session, debt_in: schemas.DebtCreate, user_id: int):
     )
     
     db.add(d)
+    d.version = _next_debts_version(db, user_id)
+    _apply_balance_deltas(db, user_id, _balance_delta(d.currency, d.debt_type, d.amount, 1))
+    # id and the Python-side defaults are filled in by the flush; no refresh SELECT needed
     db.commit()
-    db.refresh(d)
     return d
 
 def update_debt(db: Session, debt_id: int, user_id: int, debt_in: schemas.DebtUpdate):
-    d = db.query(models.Debt).filter(models.Debt.id == debt_id, models.Debt.user_id == user_id).first()
+    version = _next_debts_version(db, user_id)
+    d = _load_debt_for_write(db, debt_id, user_id)
     if not d:
+        db.rollback()
         return None
     
     # Only update fields that were provided in the request
     update_data = debt_in.model_dump(exclude_unset=True)
+    if "amount" in update_data:
+        update_data["amount"] = _to_amount(update_data["amount"])
     
+    deltas = _balance_delta(d.currency, d.debt_type, d.amount, -1)
     for field, value in update_data.items():
         setattr(d, field, value)
+    _check_amount_scale(d)
+    _merge_deltas(deltas, _balance_delta(d.currency, d.debt_type, d.amount, 1))
+    d.version = version
+    _apply_balance_deltas(db, user_id, deltas)
     
     db.commit()
-    db.refresh(d)
     return d
 
 def delete_debt(db: Session, debt_id: int, user_id: int):
-    d = db.query(models.Debt).filter(models.Debt.id == debt_id, models.Debt.user_id == user_id).first()
+    version = _next_debts_version(db, user_id)
+    d = _load_debt_for_write(db, debt_id, user_id)
     if not d:
+        db.rollback()
         return False
+    _apply_balance_deltas(db, user_id, _balance_delta(d.currency, d.debt_type, d.amount, -1))
     db.delete(d)
+    # hard delete; the tombstone is what delta sync clients see
+    db.add(models.DebtTombstone(user_id=user_id, version=version, debt_id=d.id))
     db.commit()
     return True
 
-def get_user_debts(db: Session, user_id: int, debt_type: Optional[str] = None) -> List[models.Debt]:
+def _load_debt_for_write(db: Session, debt_id: int, user_id: int) -> Optional[models.Debt]:
+    # call after _next_debts_version: the user's writers are serialized on that lock, so the
+    # row read here (refreshed even if already in the session) is what balance deltas start from
+    return db.query(models.Debt).filter(
+        models.Debt.id == debt_id, models.Debt.user_id == user_id
+    ).populate_existing().first()
+
+def bulk_create_debts(db: Session, user_id: int, debts: List[schemas.DebtCreate]) -> int:
+    """Insert many debts with one multi-row INSERT and a single commit"""
+    rows = []
+    deltas: Dict[str, List[Any]] = {}
+    for debt_in in debts:
+        amount = _to_amount(debt_in.amount)
+        rows.append({
+            "user_id": user_id,
+            "debt_type": models.DebtType(debt_in.debt_type),
+            "person_name": debt_in.person_name,
+            "amount": amount,
+            "currency": debt_in.currency,
+            "description": debt_in.description,
+            "due_date": debt_in.due_date,
+        })
+        _merge_deltas(deltas, _balance_delta(debt_in.currency, debt_in.debt_type, amount, 1))
+    if not rows:
+        return 0
+    version = _next_debts_version(db, user_id)
+    for row in rows:
+        row["version"] = version
+    db.execute(insert(models.Debt), rows)
+    _apply_balance_deltas(db, user_id, deltas)
+    db.commit()
+    return len(rows)
+
+def get_user_debts(
+    db: Session,
+    user_id: int,
+    debt_type: Optional[str] = None,
+    currency: Optional[str] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    overdue: bool = False,
+    person_name: Optional[str] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None,
+) -> List[models.Debt]:
+    """
+    List a user's debts newest first, with all filters applied in SQL.
+    
+    Pagination is keyset based: pass the (start_date, id) of the last row
+    of the previous page as `after` so every page is an index range scan.
+    """
     q = db.query(models.Debt).filter(models.Debt.user_id == user_id)
     if debt_type:
         # allow filtering by owed_to / owed_by / individual
@@ -118,13 +318,346 @@ def get_user_debts(db: Session, user_id: int, debt_type: Optional[str] = None) -
         except ValueError:
             # unknown value -> return empty
             return []
-    return q.order_by(models.Debt.start_date.desc()).all()
+    if currency:
+        q = q.filter(models.Debt.currency == currency)
+    if due_from:
+        q = q.filter(models.Debt.due_date >= due_from)
+    if due_to:
+        q = q.filter(models.Debt.due_date <= due_to)
+    if overdue:
+        q = q.filter(models.Debt.due_date < datetime.utcnow())
+    if person_name:
+        q = q.filter(models.Debt.person_name.startswith(person_name, autoescape=True))
+    if after:
+        q = q.filter(tuple_(models.Debt.start_date, models.Debt.id) < tuple_(*after))
+    q = q.order_by(models.Debt.start_date.desc(), models.Debt.id.desc())
+    if limit:
+        q = q.limit(limit)
+    return q.all()
+
+def search_debts(db: Session, user_id: int, query: str, limit: int = 20, offset: int = 0) -> List[models.Debt]:
+    """
+    Debts whose person_name or description match `query`, best match first.
+    
+    Every word must match as a word prefix. On Postgres a person_name that is
+    merely similar (trigram) also matches, so small typos still find it.
+    """
+    words = search.terms(query)
+    if not words:
+        return []
+    dialect = db.get_bind().dialect.name
+    q = db.query(models.Debt).filter(models.Debt.user_id == user_id)
+    if dialect == "sqlite":
+        fts = table("debts_fts", column("rowid"))
+        q = (
+            q.join(fts, fts.c.rowid == models.Debt.id)
+            .filter(text("debts_fts MATCH :match").bindparams(match=search.sqlite_match(words)))
+            # bm25 is lower for better matches; person_name weighs double
+            .order_by(text("bm25(debts_fts, 2.0, 1.0)"), models.Debt.id.desc())
+        )
+    elif dialect == "postgresql":
+        phrase = " ".join(words)
+        document = literal_column(search.PG_DOCUMENT)
+        tsquery = func.to_tsquery(literal_column("'simple'"), search.pg_tsquery(words))
+        rank = func.greatest(func.ts_rank(document, tsquery), func.similarity(models.Debt.person_name, phrase))
+        q = (
+            q.filter(or_(document.op("@@")(tsquery), models.Debt.person_name.op("%")(phrase)))
+            .order_by(rank.desc(), models.Debt.id.desc())
+        )
+    else:
+        # no search index on other backends: plain substring match, newest first
+        for w in words:
+            q = q.filter(or_(models.Debt.person_name.icontains(w, autoescape=True), models.Debt.description.icontains(w, autoescape=True)))
+        q = q.order_by(models.Debt.start_date.desc(), models.Debt.id.desc())
+    return q.offset(offset).limit(limit).all()
+
+def apply_debt_batch(db: Session, user_id: int, operations: List[Tuple[str, Optional[int], Any]]) -> List[Tuple[str, Any]]:
+    """
+    Apply (op, debt_id, payload) operations in order inside one transaction.
+    
+    Update/delete targets are loaded with a single IN query, creates are
+    inserted with one executemany INSERT .. RETURNING where the dialect
+    supports it, deletes run as one DELETE .. WHERE id IN (..).
+    
+    Returns one (status, DebtResponse or None) pair per operation, where
+    status is created / updated / deleted / not_found, or ("invalid",
+    error messages) for an update whose merged amount is finer than its
+    currency allows.
+    """
+    # version lock first: the targets' amounts below are then the committed ones
+    version = _next_debts_version(db, user_id)
+    target_ids = {debt_id for op, debt_id, _ in operations if op != "create"}
+    targets = {}
+    if target_ids:
+        targets = {
+            d.id: d for d in db.query(models.Debt).filter(
+                models.Debt.user_id == user_id, models.Debt.id.in_(target_ids)
+            ).populate_existing()
+        }
+
+    results: List[Any] = [None] * len(operations)
+    deltas: Dict[str, List[Any]] = {}
+    creates, updated, deleted = [], [], []
+    for i, (op, debt_id, payload) in enumerate(operations):
+        if op == "create":
+            amount = _to_amount(payload.amount)
+            creates.append((i, {
+                "user_id": user_id,
+                "debt_type": models.DebtType(payload.debt_type),
+                "person_name": payload.person_name,
+                "amount": amount,
+                "currency": payload.currency,
+                "description": payload.description,
+                "due_date": payload.due_date,
+            }))
+            _merge_deltas(deltas, _balance_delta(payload.currency, payload.debt_type, amount, 1))
+            continue
+
+        d = targets.get(debt_id)
+        if d is None:
+            results[i] = ("not_found", None)
+        elif op == "delete":
+            _merge_deltas(deltas, _balance_delta(d.currency, d.debt_type, d.amount, -1))
+            deleted.append(targets.pop(debt_id).id)
+            results[i] = ("deleted", None)
+        else:
+            update_data = payload.model_dump(exclude_unset=True)
+            if "amount" in update_data:
+                update_data["amount"] = _to_amount(update_data["amount"])
+            # checked against the merged row before anything is changed, so only this operation fails
+            try:
+                money.check_scale(
+                    _to_amount(update_data.get("amount", d.amount)), update_data.get("currency", d.currency)
+                )
+            except ValueError as e:
+                results[i] = ("invalid", [str(e)])
+                continue
+            _merge_deltas(deltas, _balance_delta(d.currency, d.debt_type, d.amount, -1))
+            for field, value in update_data.items():
+                setattr(d, field, value)
+            _merge_deltas(deltas, _balance_delta(d.currency, d.debt_type, d.amount, 1))
+            updated.append((i, d))
+
+    if not (creates or updated or deleted):
+        # nothing to write: release the lock without moving the version
+        db.rollback()
+        return results
+    for _, row in creates:
+        row["version"] = version
+    for _, d in updated:
+        d.version = version
+
+    if creates:
+        rows = [row for _, row in creates]
+        if db.get_bind().dialect.insert_executemany_returning:
+            new = db.scalars(insert(models.Debt).returning(models.Debt, sort_by_parameter_order=True), rows).all()
+        else:
+            new = [models.Debt(**row) for row in rows]
+            db.add_all(new)
+        updated += [(i, d) for (i, _), d in zip(creates, new)]
+    if deleted:
+        db.execute(delete(models.Debt).where(models.Debt.id.in_(deleted)))
+        db.execute(insert(models.DebtTombstone), [
+            {"user_id": user_id, "version": version, "debt_id": debt_id} for debt_id in deleted
+        ])
+    _apply_balance_deltas(db, user_id, deltas)
+    db.flush()
+
+    # snapshot while flushed state is loaded, independent of the session's expire_on_commit
+    for i, d in updated:
+        status_ = "created" if operations[i][0] == "create" else "updated"
+        results[i] = (status_, schemas.DebtResponse.model_validate(d))
+    db.commit()
+    return results
+
+def iter_user_debts(db: Session, user_id: int, batch_size: int = 1000) -> Iterator[models.Debt]:
+    """Stream a user's debts newest first, fetching batch_size rows at a time from a server-side cursor"""
+    stmt = (
+        select(models.Debt)
+        .where(models.Debt.user_id == user_id)
+        .order_by(models.Debt.start_date.desc(), models.Debt.id.desc())
+        .execution_options(yield_per=batch_size)
+    )
+    # the identity map only holds weak references, so written-out rows are freed as we go
+    yield from db.execute(stmt).scalars()
+
+def get_debt_changes(
+    db: Session, user_id: int, after: Optional[Tuple[int, Optional[int]]] = None, limit: int = 500
+) -> Tuple[List[models.Debt], List[int], Tuple[int, Optional[int]], bool]:
+    """
+    Debts written and deleted after the (version, id) position `after`, in
+    (version, id) order, for delta sync. An id of None stands for every row
+    of that version; `after=None` is a first sync, which returns every live
+    debt and no deletes.
+    
+    Only versions up to the user's current debts_version, read first, are
+    returned: later writes may not have committed yet and are left for the
+    next call.
+    
+    Returns (changed debts, deleted ids, position to resume from, has_more).
+    """
+    current = db.execute(select(models.User.debts_version).where(models.User.id == user_id)).scalar_one()
+
+    def newer(version_col, id_col):
+        cond = [version_col <= current]
+        if after is not None:
+            version, debt_id = after
+            cond.append(version_col > version if debt_id is None else tuple_(version_col, id_col) > tuple_(version, debt_id))
+        return cond
+
+    changed = db.query(models.Debt).filter(
+        models.Debt.user_id == user_id, *newer(models.Debt.version, models.Debt.id)
+    ).order_by(models.Debt.version, models.Debt.id).limit(limit + 1).all()
+    entries = [(d.version, d.id, d) for d in changed]
+    if after is not None:
+        deleted = db.query(models.DebtTombstone.version, models.DebtTombstone.debt_id).filter(
+            models.DebtTombstone.user_id == user_id, *newer(models.DebtTombstone.version, models.DebtTombstone.debt_id)
+        ).order_by(models.DebtTombstone.version, models.DebtTombstone.debt_id).limit(limit + 1).all()
+        entries += [(version, debt_id, None) for version, debt_id in deleted]
+        entries.sort(key=lambda e: (e[0], e[1]))
+
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    position = (entries[-1][0], entries[-1][1]) if has_more else (current, None)
+    changed = [d for _, _, d in entries if d is not None]
+    # SQLite may hand a deleted max id to a new debt; the live row is always the later change,
+    # so a tombstone for an id that is also in this page's changes is superseded by it
+    live = {d.id for d in changed}
+    return changed, [debt_id for _, debt_id, d in entries if d is None and debt_id not in live], position, has_more
+
+# --- Balances ---
+def _to_amount(value) -> Decimal:
+    # Debt.amount is NUMERIC; balances are kept as exact Decimal sums of it
+    if value is None:
+        return Decimal(0)
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+def _check_amount_scale(d: models.Debt):
+    # an amount-only (or currency-only) update is only checkable against the merged row
+    try:
+        money.check_scale(_to_amount(d.amount), d.currency)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+
+def _is_owed_to(debt_type) -> bool:
+    # debt_type may still be the raw string assigned from the request schema
+    return getattr(debt_type, "value", debt_type) == models.DebtType.owed_to.value
+
+def _balance_delta(currency: Optional[str], debt_type, amount, sign: int) -> Dict[str, List[Any]]:
+    amt = _to_amount(amount) * sign
+    if _is_owed_to(debt_type):
+        return {currency or "UZS": [amt, 0, sign]}
+    return {currency or "UZS": [0, amt, sign]}
+
+def _merge_deltas(target: Dict[str, List[Any]], other: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+    for code, vals in other.items():
+        current = target.setdefault(code, [0, 0, 0])
+        for i, v in enumerate(vals):
+            current[i] += v
+    return target
+
+def _apply_balance_deltas(db: Session, user_id: int, deltas: Dict[str, List[Any]]):
+    """Add [owed_to, owed_by, debt_count] deltas to the user's balance rows in the current transaction."""
+    # one INSERT .. ON CONFLICT DO UPDATE per currency, so concurrent first debts in a currency don't collide
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    for code, (owed_to, owed_by, count) in deltas.items():
+        if not (owed_to or owed_by or count):
+            continue
+        stmt = dialect_insert(models.UserBalance).values(
+            user_id=user_id, currency=code, owed_to=owed_to, owed_by=owed_by, debt_count=count
+        )
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[models.UserBalance.user_id, models.UserBalance.currency],
+            set_={
+                "owed_to": models.UserBalance.owed_to + stmt.excluded.owed_to,
+                "owed_by": models.UserBalance.owed_by + stmt.excluded.owed_by,
+                "debt_count": models.UserBalance.debt_count + stmt.excluded.debt_count,
+            },
+        ))
+
+def _aggregate_debt_balances(db: Session, user_id: Optional[int] = None):
+    """Recompute (user_id, currency, owed_to, owed_by, debt_count) rows straight from the debts table."""
+    code = func.coalesce(models.Debt.currency, "UZS")
+    amount = func.coalesce(models.Debt.amount, 0)
+    is_owed_to = models.Debt.debt_type == models.DebtType.owed_to
+    q = db.query(
+        models.Debt.user_id,
+        code.label("currency"),
+        func.sum(case((is_owed_to, amount), else_=0)).label("owed_to"),
+        func.sum(case((is_owed_to, 0), else_=amount)).label("owed_by"),
+        func.count(models.Debt.id).label("debt_count"),
+    )
+    if user_id is not None:
+        q = q.filter(models.Debt.user_id == user_id)
+    return q.group_by(models.Debt.user_id, code).all()
+
+def rebuild_user_balances(db: Session, user_id: Optional[int] = None, dry_run: bool = False) -> List[Dict[str, Any]]:
+    """
+    Recompute user_balances from the debts table and report any drift.
+    
+    Args:
+        db: Database session
+        user_id: Only rebuild this user's balances (all users when None)
+        dry_run: Report drift without rewriting the table
+        
+    Returns:
+        List of drift entries, one per (user_id, currency) whose stored
+        totals differ from the recomputed ones
+    """
+    # take every in-scope user's version lock before reading, as the debt writes do, so no
+    # write can commit between the aggregate below and the rewrite
+    scope = [user_id] if user_id is not None else db.scalars(select(models.User.id).order_by(models.User.id)).all()
+    _bump_version(db, "debts", *scope)
+    expected = {
+        (r.user_id, r.currency): (r.owed_to or 0, r.owed_by or 0, r.debt_count)
+        for r in _aggregate_debt_balances(db, user_id)
+    }
+    q = db.query(models.UserBalance)
+    if user_id is not None:
+        q = q.filter(models.UserBalance.user_id == user_id)
+    actual = {
+        (b.user_id, b.currency): (b.owed_to, b.owed_by, b.debt_count)
+        for b in q.all()
+        if b.owed_to or b.owed_by or b.debt_count
+    }
+
+    drift = []
+    for key in sorted(set(expected) | set(actual), key=lambda k: (k[0], k[1])):
+        exp = expected.get(key, (0, 0, 0))
+        act = actual.get(key, (0, 0, 0))
+        if exp != act:
+            drift.append({
+                "user_id": key[0],
+                "currency": key[1],
+                "expected": dict(zip(("owed_to", "owed_by", "debt_count"), exp)),
+                "actual": dict(zip(("owed_to", "owed_by", "debt_count"), act)),
+            })
+
+    if dry_run or not drift:
+        # nothing rewritten: release the locks without moving the versions
+        db.rollback()
+    else:
+        stmt = delete(models.UserBalance)
+        if user_id is not None:
+            stmt = stmt.where(models.UserBalance.user_id == user_id)
+        db.execute(stmt)
+        if expected:
+            db.execute(insert(models.UserBalance), [
+                {"user_id": uid, "currency": code, "owed_to": vals[0], "owed_by": vals[1], "debt_count": vals[2]}
+                for (uid, code), vals in expected.items()
+            ])
+        db.commit()
+    return drift
 
 # --- Monitoring / Aggregation ---
 def get_monitoring_summary(db: Session, user_id: int) -> List[Dict[str, Any]]:
     """
     Get a summary of all debts for a user, grouped by currency.
     
+    The totals are read from the user_balances table, which the debt write
+    paths keep up to date, so this is a lookup of a few rows regardless of
+    how many debts the user has.
+    
     Args:
         db: Database session
         user_id: ID of the user
@@ -136,50 +669,146 @@ def get_monitoring_summary(db: Session, user_id: int) -> List[Dict[str, Any]]:
         HTTPException: If there's an error processing the debts
     """
     try:
-        debts = db.query(models.Debt).filter(models.Debt.user_id == user_id).all()
-        summary = {}
-        
-        for d in debts:
-            try:
-                code = d.currency or "UZS"
-                if code not in summary:
-                    summary[code] = {"owed_to": 0, "owed_by": 0}
-                
-                # Safely convert amount to integer
-                try:
-                    amt = int(d.amount) if d.amount is not None else 0
-                except (ValueError, TypeError):
-                    amt = 0
-                
-                # Update summary based on debt type
-                if d.debt_type == models.DebtType.owed_to:
-                    summary[code]["owed_to"] += amt
-                elif d.debt_type == models.DebtType.owed_by:
-                    summary[code]["owed_by"] += amt
-                else:
-                    # Default to owed_by for unknown types
-                    summary[code]["owed_by"] += amt
-            except Exception as e:
-                # Log the error but continue processing other debts
-                print(f"Error processing debt {d.id}: {str(e)}")
-                continue
-        
-        # Prepare the result
-        result = []
-        for code, vals in summary.items():
-            result.append({
-                "currency": code,
-                "total_owed_to": vals["owed_to"],
-                "total_owed_by": vals["owed_by"],
-                "balance": vals["owed_to"] - vals["owed_by"]
-            })
-            
-        return result
+        balances = (
+            db.query(models.UserBalance)
+            .filter(models.UserBalance.user_id == user_id, models.UserBalance.debt_count > 0)
+            .order_by(models.UserBalance.currency)
+            .all()
+        )
+
+        return [_summary_row(b) for b in balances]
         
-    except Exception as e:
+    except Exception:
         # Log the error and return a 500 error
-        print(f"Error in get_monitoring_summary: {str(e)}")
+        logger.exception("Error in get_monitoring_summary")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An error occurred while processing your request"
+        )
+
+def _summary_row(b: models.UserBalance) -> Dict[str, Any]:
+    return {
+        "currency": b.currency,
+        "total_owed_to": b.owed_to,
+        "total_owed_by": b.owed_by,
+        "balance": b.owed_to - b.owed_by
+    }
+
+def get_monitoring_overview(db: Session, user_id: int) -> Dict[str, Any]:
+    """
+    Per-currency summary plus a consolidated total in the user's default currency.
+    
+    The default currency and the balance rows come back from one query
+    (settings LEFT JOIN user_balances); conversion then applies one cached
+    exchange rate per currency row.
+    """
+    try:
+        rows = (
+            db.query(models.Setting.default_currency, models.UserBalance)
+            .outerjoin(models.UserBalance, and_(
+                models.UserBalance.user_id == models.Setting.user_id,
+                models.UserBalance.debt_count > 0,
+            ))
+            .filter(models.Setting.user_id == user_id)
+            .order_by(models.UserBalance.currency)
+            .all()
+        )
+    except Exception:
+        logger.exception("Error in get_monitoring_overview")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An error occurred while processing your request"
         )
+    if rows:
+        target = rows[0][0] or "UZS"
+        summary = [_summary_row(b) for _, b in rows if b is not None]
+    else:
+        # no settings row: fall back to the plain summary and the app-wide default
+        target = "UZS"
+        summary = get_monitoring_summary(db, user_id)
+    return {"summary": summary, "consolidated": rates.consolidate(summary, target)}
+
+def get_counterparty_rollups(
+    db: Session,
+    user_id: int,
+    limit: int = 50,
+    offset: int = 0,
+    person_name: Optional[str] = None,
+    currency: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Per-counterparty totals, largest exposure (owed_to + owed_by) first.
+    Amounts in currencies without a rate count at face value for ordering;
+    they are left out of the converted figures and listed in missing_rates,
+    and a person with no convertible amount gets an exposure of None.
+    
+    One grouped query over the user's debts: rows are grouped by
+    (person_name, currency), a window sum converts each person's totals to
+    the rate table's base currency for ordering, and DENSE_RANK pages over
+    people rather than over (person, currency) rows. The user's default
+    currency rides along as a scalar subquery. Converted figures are then
+    worked out from the few grouped rows with one rate per currency.
+    
+    Returns (entries, has_more).
+    """
+    table_ = rates.get_rates()
+    code = func.coalesce(models.Debt.currency, "UZS")
+    is_owed_to = models.Debt.debt_type == models.DebtType.owed_to
+    # units of base per unit of each currency; unrated amounts (or all, with no rates loaded)
+    # order at face value rather than as zero
+    known = {c: 1 / r for c, r in table_.rates.items() if c}
+    to_base = case(known, value=code, else_=1) if known else 1
+
+    q = select(
+        models.Debt.person_name,
+        code.label("currency"),
+        func.sum(case((is_owed_to, models.Debt.amount), else_=0)).label("owed_to"),
+        func.sum(case((is_owed_to, 0), else_=models.Debt.amount)).label("owed_by"),
+        func.count(models.Debt.id).label("debt_count"),
+        func.sum(func.sum(models.Debt.amount * to_base)).over(partition_by=models.Debt.person_name).label("exposure"),
+    ).where(models.Debt.user_id == user_id)
+    if person_name is not None:
+        q = q.where(models.Debt.person_name == person_name)
+    if currency:
+        q = q.where(code == currency)
+    grouped = q.group_by(models.Debt.person_name, code).subquery()
+
+    ranked = select(
+        grouped,
+        func.dense_rank().over(order_by=(grouped.c.exposure.desc(), grouped.c.person_name)).label("rnk"),
+    ).subquery()
+    default_currency = select(models.Setting.default_currency).where(models.Setting.user_id == user_id).scalar_subquery()
+    rows = db.execute(
+        select(ranked, default_currency.label("default_currency"))
+        .where(ranked.c.rnk > offset, ranked.c.rnk <= offset + limit + 1)
+        .order_by(ranked.c.rnk, ranked.c.currency)
+    ).all()
+
+    people: Dict[str, List[Any]] = {}
+    has_more = False
+    for r in rows:
+        if r.rnk > offset + limit:
+            has_more = True
+            continue
+        people.setdefault(r.person_name, []).append(r)
+
+    entries = []
+    for name, person_rows in people.items():
+        target = person_rows[0].default_currency or "UZS"
+        currencies = [{
+            "currency": r.currency,
+            "total_owed_to": _to_amount(r.owed_to),
+            "total_owed_by": _to_amount(r.owed_by),
+            "balance": _to_amount(r.owed_to) - _to_amount(r.owed_by),
+            "debt_count": r.debt_count,
+        } for r in person_rows]
+        consolidated = rates.consolidate(currencies, target, table_)
+        converted = len(consolidated["missing_rates"]) < len(currencies)
+        entries.append({
+            "person_name": name,
+            "debt_count": sum(c["debt_count"] for c in currencies),
+            "exposure": consolidated["total_owed_to"] + consolidated["total_owed_by"] if converted else None,
+            "currencies": currencies,
+            "consolidated": consolidated,
+        })
+    return entries, has_more
@@ -0,0 +1,112 @@
+"""
+Async counterparts of the functions in crud.py.
+
+Each function runs the sync implementation through AsyncSession.run_sync, so
+the queries go through the async driver (asyncpg / aiosqlite) on the event
+loop without occupying a threadpool worker, while crud.py stays the single
+source of truth for the query logic.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud, hashing, models, schemas
+
+
+# --- Users ---
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.run_sync(crud.get_user_by_username, username)
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.run_sync(crud.get_user_by_email, email)
+
+async def find_user_conflict(db: AsyncSession, username: str, email: Optional[str] = None) -> Optional[str]:
+    return await db.run_sync(crud.find_user_conflict, username, email)
+
+async def create_user(db: AsyncSession, user_in: schemas.UserCreate):
+    hashed = await hashing.hash_password_async(user_in.password)
+    return await db.run_sync(crud.create_user, user_in, hashed)
+
+async def update_password_hash(db: AsyncSession, user: models.User, password_hash: str):
+    return await db.run_sync(crud.update_password_hash, user, password_hash)
+
+async def get_version_stamp(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_version_stamp, user_id)
+
+# --- Settings ---
+async def get_setting(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_setting, user_id)
+
+async def upsert_setting(db: AsyncSession, user_id: int, setting_in: schemas.SettingUpdate):
+    return await db.run_sync(crud.upsert_setting, user_id, setting_in)
+
+# --- Debts ---
+async def create_debt(db: AsyncSession, debt_in: schemas.DebtCreate, user_id: int):
+    return await db.run_sync(crud.create_debt, debt_in, user_id)
+
+async def update_debt(db: AsyncSession, debt_id: int, user_id: int, debt_in: schemas.DebtUpdate):
+    return await db.run_sync(crud.update_debt, debt_id, user_id, debt_in)
+
+async def delete_debt(db: AsyncSession, debt_id: int, user_id: int):
+    return await db.run_sync(crud.delete_debt, debt_id, user_id)
+
+async def bulk_create_debts(db: AsyncSession, user_id: int, debts: List[schemas.DebtCreate]) -> int:
+    return await db.run_sync(crud.bulk_create_debts, user_id, debts)
+
+async def apply_debt_batch(db: AsyncSession, user_id: int, operations: List[Tuple[str, Optional[int], Any]]) -> List[Tuple[str, Any]]:
+    return await db.run_sync(crud.apply_debt_batch, user_id, operations)
+
+async def get_user_debts(
+    db: AsyncSession,
+    user_id: int,
+    debt_type: Optional[str] = None,
+    currency: Optional[str] = None,
+    due_from: Optional[datetime] = None,
+    due_to: Optional[datetime] = None,
+    overdue: bool = False,
+    person_name: Optional[str] = None,
+    after: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None,
+) -> List[models.Debt]:
+    return await db.run_sync(
+        lambda s: crud.get_user_debts(
+            s, user_id,
+            debt_type=debt_type, currency=currency,
+            due_from=due_from, due_to=due_to, overdue=overdue,
+            person_name=person_name, after=after, limit=limit,
+        )
+    )
+
+async def get_debt_changes(
+    db: AsyncSession, user_id: int, after: Optional[Tuple[int, Optional[int]]] = None, limit: int = 500
+) -> Tuple[List[models.Debt], List[int], Tuple[int, Optional[int]], bool]:
+    return await db.run_sync(crud.get_debt_changes, user_id, after, limit)
+
+async def search_debts(db: AsyncSession, user_id: int, query: str, limit: int = 20, offset: int = 0) -> List[models.Debt]:
+    return await db.run_sync(crud.search_debts, user_id, query, limit, offset)
+
+# --- Balances ---
+async def rebuild_user_balances(db: AsyncSession, user_id: Optional[int] = None, dry_run: bool = False) -> List[Dict[str, Any]]:
+    return await db.run_sync(lambda s: crud.rebuild_user_balances(s, user_id=user_id, dry_run=dry_run))
+
+# --- Monitoring / Aggregation ---
+async def get_monitoring_summary(db: AsyncSession, user_id: int) -> List[Dict[str, Any]]:
+    return await db.run_sync(crud.get_monitoring_summary, user_id)
+
+async def get_monitoring_overview(db: AsyncSession, user_id: int) -> Dict[str, Any]:
+    return await db.run_sync(crud.get_monitoring_overview, user_id)
+
+async def get_counterparty_rollups(
+    db: AsyncSession,
+    user_id: int,
+    limit: int = 50,
+    offset: int = 0,
+    person_name: Optional[str] = None,
+    currency: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], bool]:
+    return await db.run_sync(
+        lambda s: crud.get_counterparty_rollups(
+            s, user_id, limit=limit, offset=offset, person_name=person_name, currency=currency
+        )
+    )
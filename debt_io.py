@@ -0,0 +1,189 @@
+"""
+Wire formats for moving debts in and out in bulk.
+
+Imports are read from the request body as it arrives: NDJSON and CSV are
+parsed record by record, a JSON array is decoded in one go. Every record is
+validated against schemas.DebtCreate on its own so a bad row is reported
+without failing the rest of the upload.
+
+Exports go the other way: rows come off a server-side cursor and are written
+out in small chunks, so memory stays flat however many debts a user has.
+"""
+import csv
+import io
+import json
+from decimal import Decimal
+from typing import AsyncIterator, Iterator, List, Tuple, Union
+
+from fastapi import HTTPException, Request, status
+from pydantic import ValidationError
+
+import crud, database, models, money, schemas
+
+EXPORT_FIELDS = [
+    "id", "user_id", "debt_type", "person_name", "amount", "currency",
+    "description", "start_date", "due_date", "created_at",
+]
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+# flush to the client roughly every 64KB
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"}
+CSV_TYPES = {"text/csv", "application/csv"}
+JSON_TYPES = {"application/json"}
+
+
+class ImportRowError(ValueError):
+    def __init__(self, errors: List[str]):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+async def _iter_lines(request: Request) -> AsyncIterator[str]:
+    buffer = ""
+    decoder = io.IncrementalNewlineDecoder(None, translate=True)
+    async for chunk in request.stream():
+        buffer += decoder.decode(chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line
+    buffer += decoder.decode("", final=True)
+    if buffer:
+        yield buffer
+
+
+async def _iter_csv_records(request: Request) -> AsyncIterator[dict]:
+    header = None
+    pending = ""
+    async for line in _iter_lines(request):
+        # a quoted field may span lines: wait until the quotes balance
+        pending = f"{pending}\n{line}" if pending else line
+        if pending.count('"') % 2:
+            continue
+        record, pending = pending, ""
+        if not record.strip():
+            continue
+        values = next(csv.reader([record]))
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+        yield dict(zip(header, values))
+    if pending:
+        raise HTTPException(status_code=400, detail="Unterminated quoted field in CSV")
+
+
+async def iter_import_records(request: Request) -> AsyncIterator[Tuple[int, Union[str, dict]]]:
+    """Yield (row number, raw record) pairs from a JSON array, NDJSON or CSV body"""
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_TYPES:
+        row = 0
+        async for line in _iter_lines(request):
+            if line.strip():
+                row += 1
+                yield row, line
+    elif content_type in CSV_TYPES:
+        row = 0
+        async for record in _iter_csv_records(request):
+            row += 1
+            yield row, record
+    elif content_type in JSON_TYPES:
+        try:
+            data = json.loads(await request.body())
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body is not valid JSON")
+        if not isinstance(data, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of debts")
+        for row, record in enumerate(data, start=1):
+            yield row, record
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send application/json, application/x-ndjson or text/csv",
+        )
+
+
+def _validation_messages(e: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(p) for p in err['loc']) or 'row'}: {err['msg']}" for err in e.errors()]
+
+
+def _check_debt_type(debt_type):
+    try:
+        models.DebtType(debt_type)
+    except ValueError:
+        raise ImportRowError([f"debt_type: must be one of {', '.join(t.value for t in models.DebtType)}"])
+
+
+def parse_debt_update(record) -> schemas.DebtUpdate:
+    """Validate a partial update; raises ImportRowError with readable messages"""
+    if not isinstance(record, dict):
+        raise ImportRowError(["data: expected an object"])
+    try:
+        debt = schemas.DebtUpdate.model_validate(record)
+    except ValidationError as e:
+        raise ImportRowError(_validation_messages(e))
+    if debt.debt_type is not None:
+        _check_debt_type(debt.debt_type)
+    return debt
+
+
+def parse_debt_record(record: Union[str, dict]) -> schemas.DebtCreate:
+    """Validate one raw record; raises ImportRowError with readable messages"""
+    if isinstance(record, str):
+        try:
+            record = json.loads(record)
+        except ValueError as e:
+            raise ImportRowError([f"invalid JSON: {e}"])
+    if not isinstance(record, dict):
+        raise ImportRowError(["expected an object"])
+    # empty CSV cells mean "not given" so schema defaults apply
+    record = {k: v for k, v in record.items() if k and v != ""}
+    try:
+        debt = schemas.DebtCreate.model_validate(record)
+    except ValidationError as e:
+        raise ImportRowError(_validation_messages(e))
+    _check_debt_type(debt.debt_type)
+    return debt
+
+
+def _export_values(d: models.Debt) -> list:
+    values = []
+    for field in EXPORT_FIELDS:
+        value = getattr(d, field)
+        if isinstance(value, models.DebtType):
+            value = value.value
+        elif isinstance(value, Decimal):
+            value = money.to_json_number(value)
+        elif hasattr(value, "isoformat"):
+            value = value.isoformat()
+        values.append(value)
+    return values
+
+
+def stream_export(user_id: int, fmt: str = "ndjson", batch_size: int = 1000) -> Iterator[str]:
+    """
+    Yield an export of the user's debts in text chunks.
+
+    Opens its own session: the response body is produced after the request
+    dependencies (and their session) have finished.
+    """
+    db = database.SessionLocal()
+    try:
+        buf = io.StringIO()
+        writer = csv.writer(buf, lineterminator="\n")
+        if fmt == "csv":
+            writer.writerow(EXPORT_FIELDS)
+        for d in crud.iter_user_debts(db, user_id, batch_size=batch_size):
+            values = _export_values(d)
+            if fmt == "csv":
+                writer.writerow(values)
+            else:
+                buf.write(json.dumps(dict(zip(EXPORT_FIELDS, values)), ensure_ascii=False))
+                buf.write("\n")
+            if buf.tell() >= EXPORT_CHUNK_SIZE:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+    finally:
+        db.close()
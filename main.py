@@ -1,18 +1,42 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from database import engine, Base
-import models
-from routers import users, debts, settings, monitoring
+import database, hashing, metrics, profiling, reminders
+from routers import users, debts, settings, monitoring, internal
 
-# Create tables (dev) — productionda alembic ishlatish tavsiya etiladi
-Base.metadata.create_all(bind=engine)
+# Schema is managed by Alembic, not at import: run `alembic upgrade head` before starting the app
 
-app = FastAPI(title="Debt Manager API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # with several workers each runs a scheduler; reminder_deliveries keeps sends unique
+    scheduler = None
+    if reminders.REMINDER_SCHEDULER:
+        scheduler = reminders.ReminderScheduler()
+        scheduler.start()
+    yield
+    if scheduler is not None:
+        scheduler.stop()
+    hashing.shutdown()
+
+app = FastAPI(title="Debt Manager API", lifespan=lifespan)
+
+# per-request SQL statement count / DB time (Server-Timing header + JSON log)
+profiling.install()
+app.add_middleware(profiling.SQLProfilerMiddleware)
+# route latency histograms / status codes / in-flight requests, scraped from /metrics
+app.add_middleware(metrics.MetricsMiddleware)
 
 # include routers
+if database.DB_ASYNC:
+    # async handlers win the route match; endpoints without a twin fall back to the sync routers
+    for module in (users, debts, settings, monitoring):
+        app.include_router(module.async_router)
+
 app.include_router(users.router)
 app.include_router(debts.router)
 app.include_router(settings.router)
 app.include_router(monitoring.router)
+app.include_router(internal.router)
+app.include_router(internal.metrics_router)
 
 @app.get("/")
 def home():
@@ -0,0 +1,70 @@
+"""
+Maintenance commands.
+
+Usage:
+    python manage.py rebuild-balances [--user-id ID] [--dry-run]
+    python manage.py run-reminders [--once] [--interval SECONDS] [--sink log|file:PATH|queue]
+"""
+import argparse
+import logging
+import sys
+
+import crud, database, reminders
+
+
+def rebuild_balances(args):
+    db = database.SessionLocal()
+    try:
+        drift = crud.rebuild_user_balances(db, user_id=args.user_id, dry_run=args.dry_run)
+    finally:
+        db.close()
+
+    for entry in drift:
+        exp, act = entry["expected"], entry["actual"]
+        print(
+            f"user {entry['user_id']} {entry['currency']}: "
+            f"owed_to {act['owed_to']} -> {exp['owed_to']}, "
+            f"owed_by {act['owed_by']} -> {exp['owed_by']}, "
+            f"debts {act['debt_count']} -> {exp['debt_count']}"
+        )
+    action = "found" if args.dry_run else "fixed"
+    print(f"{len(drift)} drifted balance row(s) {action}")
+    return 1 if drift and args.dry_run else 0
+
+
+def run_reminders(args):
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    sink = reminders.get_sink(args.sink)
+    if args.once:
+        sent = reminders.run_due_reminders(sink=sink)
+        print(f"{sent} reminder(s) sent")
+        return 0
+    scheduler = reminders.ReminderScheduler(interval=args.interval, sink=sink)
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Debt Manager maintenance commands")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("rebuild-balances", help="Recompute user_balances from debts and report drift")
+    p.add_argument("--user-id", type=int, default=None, help="Only rebuild this user's balances")
+    p.add_argument("--dry-run", action="store_true", help="Report drift without rewriting balances")
+    p.set_defaults(func=rebuild_balances)
+
+    p = sub.add_parser("run-reminders", help="Send due debt reminders (loops every --interval seconds)")
+    p.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    p.add_argument("--interval", type=float, default=None, help="Seconds between passes (REMINDER_INTERVAL_SECONDS)")
+    p.add_argument("--sink", default=None, help="log, file:PATH or queue (REMINDER_SINK)")
+    p.set_defaults(func=run_reminders)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+In-process request metrics in the Prometheus text exposition format.
+
+MetricsMiddleware records per-route latency histograms, status code
+counters and the number of in-flight requests; render() adds the DB pool
+and auth cache figures read at scrape time. The hot path is one
+perf_counter pair, a bisect and a short critical section per request.
+"""
+import bisect
+import threading
+import time
+from typing import Dict, List, Tuple
+
+import cache, database
+
+# upper bounds in seconds; +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.in_flight = 0
+            # (method, route) -> histogram
+            self.latency: Dict[Tuple[str, str], _Histogram] = {}
+            # (method, route, status) -> count
+            self.responses: Dict[Tuple[str, str, int], int] = {}
+
+    def started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finished(self, method: str, route: str, status: int, elapsed: float):
+        bucket = bisect.bisect_left(LATENCY_BUCKETS, elapsed)
+        with self._lock:
+            self.in_flight -= 1
+            hist = self.latency.get((method, route))
+            if hist is None:
+                hist = self.latency[(method, route)] = _Histogram()
+            hist.counts[bucket] += 1
+            hist.total += elapsed
+            hist.count += 1
+            key = (method, route, status)
+            self.responses[key] = self.responses.get(key, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            latency = {k: (list(h.counts), h.total, h.count) for k, h in self.latency.items()}
+            return self.in_flight, latency, dict(self.responses)
+
+
+registry = Registry()
+
+
+class MetricsMiddleware:
+    """Times every HTTP request and labels it with the matched route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        registry.started()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # the router stores the matched route in the scope; templates keep label cardinality bounded
+            route = scope.get("route")
+            registry.finished(
+                scope["method"], getattr(route, "path", UNMATCHED_ROUTE), status_code, time.perf_counter() - start
+            )
+
+
+def _labels(**labels) -> str:
+    parts = []
+    for name, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _pool_lines(lines: List[str]):
+    engines = [("sync", database.engine)]
+    if database.async_engine is not None:
+        engines.append(("async", database.async_engine.sync_engine))
+    gauges = {
+        "checked_out": "Connections currently checked out",
+        "idle": "Idle connections in the pool",
+        "overflow": "Overflow connections currently open",
+        "size": "Configured pool size",
+    }
+    counters = {
+        "checkouts": ("db_pool_checkouts_total", "Connection checkouts"),
+        "timeouts": ("db_pool_timeouts_total", "Checkouts that timed out waiting for a connection"),
+        "wait_ms_total": ("db_pool_wait_seconds_total", "Time spent waiting for a connection"),
+    }
+    statuses = [(name, database.get_pool_status(engine)) for name, engine in engines]
+    for key, help_text in gauges.items():
+        lines += [f"# HELP db_pool_{key} {help_text}", f"# TYPE db_pool_{key} gauge"]
+        lines += [f"db_pool_{key}{_labels(engine=name)} {s[key]}" for name, s in statuses if key in s]
+    for key, (metric, help_text) in counters.items():
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        for name, s in statuses:
+            if key in s:
+                value = s[key] / 1000 if key == "wait_ms_total" else s[key]
+                lines.append(f"{metric}{_labels(engine=name)} {value}")
+
+
+def _cache_lines(lines: List[str]):
+    caches = {"auth_users": cache.user_cache.stats(), "jwt": cache.token_cache.stats()}
+    for key, metric, kind, help_text in (
+        ("hits", "cache_hits_total", "counter", "Cache lookups that found a live entry"),
+        ("misses", "cache_misses_total", "counter", "Cache lookups that missed"),
+        ("evictions", "cache_evictions_total", "counter", "Entries evicted to stay under maxsize"),
+        ("size", "cache_entries", "gauge", "Entries currently cached"),
+        ("hit_rate", "cache_hit_ratio", "gauge", "hits / (hits + misses) since start"),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        lines += [f"{metric}{_labels(cache=name)} {stats[key]}" for name, stats in caches.items()]
+
+
+def render() -> str:
+    in_flight, latency, responses = registry.snapshot()
+    lines = [
+        "# HELP http_requests_in_flight Requests currently being served",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {in_flight}",
+        "# HELP http_requests_total Responses by route template and status code",
+        "# TYPE http_requests_total counter",
+    ]
+    for (method, route, status), count in sorted(responses.items()):
+        lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+
+    lines += [
+        "# HELP http_request_duration_seconds Request latency by route template",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route), (counts, total, count) in sorted(latency.items()):
+        cumulative = 0
+        for bound, n in zip(LATENCY_BUCKETS + (float("inf"),), counts):
+            cumulative += n
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(
+                f"http_request_duration_seconds_bucket{_labels(method=method, route=route, le=le)} {cumulative}"
+            )
+        lines.append(f"http_request_duration_seconds_sum{_labels(method=method, route=route)} {total}")
+        lines.append(f"http_request_duration_seconds_count{_labels(method=method, route=route)} {count}")
+
+    _pool_lines(lines)
+    _cache_lines(lines)
+    return "\n".join(lines) + "\n"
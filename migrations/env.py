@@ -0,0 +1,60 @@
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+import database
+import models  # noqa: F401  registers the tables on Base.metadata
+import search
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = database.Base.metadata
+
+
+def get_url() -> str:
+    # alembic.ini / Config.set_main_option wins, otherwise the app's DATABASE_URL
+    return config.get_main_option("sqlalchemy.url") or database.SQLALCHEMY_DATABASE_URL
+
+
+def run_migrations_offline():
+    """Emit SQL to stdout (`alembic upgrade head --sql`)"""
+    context.configure(
+        url=get_url(),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+        include_name=search.include_name,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = config.attributes.get("connection")
+    if connectable is None:
+        connectable = create_engine(get_url(), poolclass=pool.NullPool)
+        with connectable.connect() as connection:
+            _run(connection)
+        connectable.dispose()
+    else:
+        _run(connectable)
+
+
+def _run(connection):
+    # batch mode lets ALTER-style operations work on SQLite
+    context.configure(
+        connection=connection, target_metadata=target_metadata, render_as_batch=True, include_name=search.include_name
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
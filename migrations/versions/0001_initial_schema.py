@@ -0,0 +1,92 @@
+"""initial schema
+
+Tables as Base.metadata.create_all used to create them, before the debt
+access-path indexes. A database that was created by create_all should be
+stamped at this revision (`alembic stamp 0001`) and then upgraded.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("first_name", sa.String(), nullable=True),
+        sa.Column("last_name", sa.String(), nullable=True),
+        sa.Column("email", sa.String(), nullable=True),
+        sa.Column("password_hash", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("email"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+    op.create_table(
+        "settings",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("notifications_enabled", sa.Boolean(), nullable=True),
+        sa.Column("theme", sa.String(), nullable=True),
+        sa.Column("default_currency", sa.String(), nullable=True),
+        sa.Column("reminder_time", sa.DateTime(), nullable=True),
+        sa.Column("reminder_enabled", sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id"),
+    )
+    op.create_index("ix_settings_id", "settings", ["id"])
+
+    op.create_table(
+        "debts",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("debt_type", sa.Enum("owed_to", "owed_by", name="debttype"), nullable=False),
+        sa.Column("person_name", sa.String(), nullable=False),
+        sa.Column("amount", sa.Integer(), nullable=False),
+        sa.Column("currency", sa.String(), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("start_date", sa.DateTime(), nullable=True),
+        sa.Column("due_date", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_debts_id", "debts", ["id"])
+
+    op.create_table(
+        "user_balances",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("currency", sa.String(), nullable=False),
+        sa.Column("owed_to", sa.Integer(), nullable=False),
+        sa.Column("owed_by", sa.Integer(), nullable=False),
+        sa.Column("debt_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "currency"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("user_balances")
+    op.drop_index("ix_debts_id", table_name="debts")
+    op.drop_table("debts")
+    sa.Enum(name="debttype").drop(op.get_bind(), checkfirst=True)
+    op.drop_index("ix_settings_id", table_name="settings")
+    op.drop_table("settings")
+    op.drop_index("ix_users_username", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
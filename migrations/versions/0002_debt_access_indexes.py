@@ -0,0 +1,62 @@
+"""debt access-path indexes
+
+Every debt query is scoped to one user, so each index leads with user_id:
+
+- (user_id, start_date desc, id desc): the default list order / keyset pages
+- (user_id, debt_type, start_date desc, id desc): ?debt_type= lists
+- (user_id, currency, start_date desc, id desc): ?currency= lists
+- (user_id, due_date) WHERE due_date IS NOT NULL: overdue / due range filters
+- (user_id, person_name): ?person_name= prefix search
+
+Indexes are created with IF NOT EXISTS because databases built by the old
+create_all already carry some of them.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_debts_user_start_id", "debts",
+        ["user_id", sa.text("start_date DESC"), sa.text("id DESC")], if_not_exists=True,
+    )
+    op.create_index(
+        "ix_debts_user_type_start_id", "debts",
+        ["user_id", "debt_type", sa.text("start_date DESC"), sa.text("id DESC")], if_not_exists=True,
+    )
+    op.create_index(
+        "ix_debts_user_currency_start_id", "debts",
+        ["user_id", "currency", sa.text("start_date DESC"), sa.text("id DESC")], if_not_exists=True,
+    )
+    # replaced by the partial index below
+    op.drop_index("ix_debts_user_due_date", table_name="debts", if_exists=True)
+    op.create_index(
+        "ix_debts_user_due_open", "debts", ["user_id", "due_date"],
+        postgresql_where=sa.text("due_date IS NOT NULL"),
+        sqlite_where=sa.text("due_date IS NOT NULL"),
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_debts_user_person_name", "debts", ["user_id", "person_name"],
+        postgresql_ops={"person_name": "text_pattern_ops"}, if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_debts_user_person_name", table_name="debts")
+    op.drop_index("ix_debts_user_due_open", table_name="debts")
+    op.drop_index("ix_debts_user_currency_start_id", table_name="debts")
+    op.drop_index("ix_debts_user_type_start_id", table_name="debts")
+    op.drop_index("ix_debts_user_start_id", table_name="debts")
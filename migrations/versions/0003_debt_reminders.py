@@ -0,0 +1,78 @@
+"""debt reminders
+
+settings.next_reminder_at (with a partial index the scheduler pages
+through) and reminder_deliveries, whose (user_id, scheduled_for) key makes
+each reminder occurrence send at most once. next_reminder_at is backfilled
+for settings that already have reminders switched on.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("settings") as batch:
+        batch.add_column(sa.Column("next_reminder_at", sa.DateTime(), nullable=True))
+    op.create_index(
+        "ix_settings_next_reminder_at", "settings", ["next_reminder_at", "user_id"],
+        postgresql_where=sa.text("next_reminder_at IS NOT NULL"),
+        sqlite_where=sa.text("next_reminder_at IS NOT NULL"),
+    )
+    op.create_table(
+        "reminder_deliveries",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("scheduled_for", sa.DateTime(), nullable=False),
+        sa.Column("sent_at", sa.DateTime(), nullable=False),
+        sa.Column("debt_count", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "scheduled_for"),
+    )
+
+    # same rule as crud.next_reminder_at, inlined so the migration does not depend on app code
+    settings = sa.table(
+        "settings",
+        sa.column("id", sa.Integer), sa.column("reminder_time", sa.DateTime),
+        sa.column("next_reminder_at", sa.DateTime),
+        sa.column("reminder_enabled", sa.Boolean), sa.column("notifications_enabled", sa.Boolean),
+    )
+    conn = op.get_bind()
+    now = datetime.utcnow()
+    rows = conn.execute(
+        sa.select(settings.c.id, settings.c.reminder_time).where(
+            settings.c.reminder_enabled.is_(True),
+            settings.c.notifications_enabled.is_(True),
+            settings.c.reminder_time.isnot(None),
+        )
+    ).fetchall()
+    updates = []
+    for setting_id, at in rows:
+        if at.tzinfo is not None:
+            at = at.astimezone(timezone.utc).replace(tzinfo=None)
+        candidate = datetime.combine(now.date(), at.time())
+        if candidate <= now:
+            candidate += timedelta(days=1)
+        updates.append({"sid": setting_id, "next": candidate})
+    if updates:
+        conn.execute(
+            settings.update().where(settings.c.id == sa.bindparam("sid")).values(next_reminder_at=sa.bindparam("next")),
+            updates,
+        )
+
+
+def downgrade() -> None:
+    op.drop_table("reminder_deliveries")
+    op.drop_index("ix_settings_next_reminder_at", table_name="settings")
+    with op.batch_alter_table("settings") as batch:
+        batch.drop_column("next_reminder_at")
@@ -0,0 +1,55 @@
+"""decimal amounts
+
+debts.amount and the user_balances totals become NUMERIC(20, 4), so
+fractional amounts are stored exactly instead of being truncated to
+integers. Existing integer values convert losslessly.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# SQLite's batch mode rebuilds the table from reflection, which drops DESC from index columns
+DESC_INDEXES = {
+    "ix_debts_user_start_id": ["user_id", sa.text("start_date DESC"), sa.text("id DESC")],
+    "ix_debts_user_type_start_id": ["user_id", "debt_type", sa.text("start_date DESC"), sa.text("id DESC")],
+    "ix_debts_user_currency_start_id": ["user_id", "currency", sa.text("start_date DESC"), sa.text("id DESC")],
+}
+
+
+def _restore_desc_indexes():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for name, columns in DESC_INDEXES.items():
+        op.drop_index(name, table_name="debts", if_exists=True)
+        op.create_index(name, "debts", columns)
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("debts") as batch:
+        batch.alter_column("amount", existing_type=sa.Integer(), type_=sa.Numeric(20, 4), existing_nullable=False)
+    _restore_desc_indexes()
+    with op.batch_alter_table("user_balances") as batch:
+        for column in ("owed_to", "owed_by"):
+            batch.alter_column(column, existing_type=sa.Integer(), type_=sa.Numeric(20, 4), existing_nullable=False)
+
+
+def downgrade() -> None:
+    # rounds fractional amounts away, as the integer columns always did
+    with op.batch_alter_table("user_balances") as batch:
+        for column in ("owed_to", "owed_by"):
+            batch.alter_column(column, existing_type=sa.Numeric(20, 4), type_=sa.Integer(), existing_nullable=False)
+    with op.batch_alter_table("debts") as batch:
+        batch.alter_column("amount", existing_type=sa.Numeric(20, 4), type_=sa.Integer(), existing_nullable=False)
+    _restore_desc_indexes()
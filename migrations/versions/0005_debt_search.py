@@ -0,0 +1,79 @@
+"""debt full-text search
+
+SQLite: an FTS5 external-content table over debts(person_name, description)
+with sync triggers, filled from the existing rows. Postgres: pg_trgm plus
+GIN indexes on the 'simple' tsvector of both columns and on person_name
+trigrams. Statements match search.py as of this revision.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_UPGRADE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS debts_fts USING fts5("
+    "person_name, description, content='debts', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS debts_fts_ai AFTER INSERT ON debts BEGIN "
+    "INSERT INTO debts_fts(rowid, person_name, description) VALUES (new.id, new.person_name, new.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS debts_fts_ad AFTER DELETE ON debts BEGIN "
+    "INSERT INTO debts_fts(debts_fts, rowid, person_name, description) "
+    "VALUES ('delete', old.id, old.person_name, old.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS debts_fts_au AFTER UPDATE OF person_name, description ON debts BEGIN "
+    "INSERT INTO debts_fts(debts_fts, rowid, person_name, description) "
+    "VALUES ('delete', old.id, old.person_name, old.description); "
+    "INSERT INTO debts_fts(rowid, person_name, description) VALUES (new.id, new.person_name, new.description); "
+    "END",
+    # index the rows that already exist
+    "INSERT INTO debts_fts(debts_fts) VALUES ('rebuild')",
+]
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS debts_fts_au",
+    "DROP TRIGGER IF EXISTS debts_fts_ad",
+    "DROP TRIGGER IF EXISTS debts_fts_ai",
+    "DROP TABLE IF EXISTS debts_fts",
+]
+
+POSTGRES_UPGRADE = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_debts_search_tsv ON debts USING gin "
+    "(to_tsvector('simple', coalesce(person_name, '') || ' ' || coalesce(description, '')))",
+    "CREATE INDEX IF NOT EXISTS ix_debts_person_name_trgm ON debts USING gin (person_name gin_trgm_ops)",
+]
+POSTGRES_DOWNGRADE = [
+    "DROP INDEX IF EXISTS ix_debts_person_name_trgm",
+    "DROP INDEX IF EXISTS ix_debts_search_tsv",
+]
+
+
+def _run(statements):
+    for statement in statements:
+        op.execute(statement)
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _run(SQLITE_UPGRADE)
+    elif dialect == "postgresql":
+        _run(POSTGRES_UPGRADE)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        _run(SQLITE_DOWNGRADE)
+    elif dialect == "postgresql":
+        _run(POSTGRES_DOWNGRADE)
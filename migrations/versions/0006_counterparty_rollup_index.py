@@ -0,0 +1,35 @@
+"""counterparty rollup index
+
+Widen (user_id, person_name) to (user_id, person_name, currency, debt_type,
+amount) so GET /api/monitoring/counterparties groups a user's debts from the
+index alone. The leading columns still serve ?person_name= prefix search.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index("ix_debts_user_person_name", table_name="debts")
+    op.create_index(
+        "ix_debts_user_person_name", "debts", ["user_id", "person_name", "currency", "debt_type", "amount"],
+        postgresql_ops={"person_name": "text_pattern_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_debts_user_person_name", table_name="debts")
+    op.create_index(
+        "ix_debts_user_person_name", "debts", ["user_id", "person_name"],
+        postgresql_ops={"person_name": "text_pattern_ops"},
+    )
@@ -0,0 +1,36 @@
+"""user version stamps
+
+users.debts_version / settings_version and their *_updated_at timestamps,
+used as ETag / Last-Modified validators for conditional GETs. Existing users
+start at version 0 with no modification time.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.add_column(sa.Column("debts_version", sa.Integer(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("debts_updated_at", sa.DateTime(), nullable=True))
+        batch.add_column(sa.Column("settings_version", sa.Integer(), nullable=False, server_default="0"))
+        batch.add_column(sa.Column("settings_updated_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch:
+        batch.drop_column("settings_updated_at")
+        batch.drop_column("settings_version")
+        batch.drop_column("debts_updated_at")
+        batch.drop_column("debts_version")
@@ -0,0 +1,50 @@
+"""debt change tracking
+
+debts.updated_at and debts.version (the owner's users.debts_version at the
+last write), an index walking a user's debts in (version, id) order, and
+debt_tombstones for deletes. Together they let GET /api/debts/sync return
+only what changed after a client's cursor.
+
+Existing debts start at version 0 with updated_at = created_at, so the
+first sync of an old client returns everything once.
+
+The columns are added with plain ALTER TABLE (no batch rebuild) so the
+search triggers on debts stay in place on SQLite.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("debts", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.add_column("debts", sa.Column("version", sa.Integer(), nullable=False, server_default="0"))
+    op.execute("UPDATE debts SET updated_at = created_at")
+    op.create_index("ix_debts_user_version_id", "debts", ["user_id", "version", "id"])
+    op.create_table(
+        "debt_tombstones",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("debt_id", sa.Integer(), nullable=False),
+        sa.Column("deleted_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "version", "debt_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("debt_tombstones")
+    op.drop_index("ix_debts_user_version_id", table_name="debts")
+    op.drop_column("debts", "version")
+    op.drop_column("debts", "updated_at")
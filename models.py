@@ -1,9 +1,10 @@
 from datetime import datetime
-from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Enum
+from sqlalchemy import Boolean, Column, Integer, Numeric, String, Text, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship, declarative_base
 import enum
 
 from database import Base
+import search
 
 class DebtType(enum.Enum):
     owed_to = "owed_to"
@@ -19,6 +20,12 @@ class User(Base):
     email = Column(String, unique=True, nullable=True)
     password_hash = Column(String, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # version stamps behind the ETag / Last-Modified headers (see conditional.py),
+    # bumped by the crud write paths in the same transaction as the change
+    debts_version = Column(Integer, nullable=False, default=0, server_default="0")
+    debts_updated_at = Column(DateTime, default=datetime.utcnow)
+    settings_version = Column(Integer, nullable=False, default=0, server_default="0")
+    settings_updated_at = Column(DateTime, default=datetime.utcnow)
 
     settings = relationship("Setting", back_populates="user", uselist=False)
     debts = relationship("Debt", back_populates="user")
@@ -33,9 +40,19 @@ class Setting(Base):
     default_currency = Column(String, default="UZS")
     reminder_time = Column(DateTime, nullable=True)
     reminder_enabled = Column(Boolean, default=False)
+    # next daily reminder (UTC), derived from the fields above; NULL when reminders are off
+    next_reminder_at = Column(DateTime, nullable=True)
 
     user = relationship("User", back_populates="settings")
 
+    __table_args__ = (
+        # the scheduler only ever looks for settings whose reminder is due
+        Index(
+            "ix_settings_next_reminder_at", next_reminder_at, user_id,
+            postgresql_where=next_reminder_at.isnot(None), sqlite_where=next_reminder_at.isnot(None),
+        ),
+    )
+
 class Debt(Base):
     __tablename__ = "debts"
 
@@ -43,11 +60,65 @@ class Debt(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     debt_type = Column(Enum(DebtType), nullable=False)
     person_name = Column(String, nullable=False)
-    amount = Column(Integer, nullable=False)
+    # exact decimal; per-currency precision is enforced by the schemas (see money.py)
+    amount = Column(Numeric(20, 4), nullable=False)
     currency = Column(String, default="UZS")
     description = Column(Text, nullable=True)
     start_date = Column(DateTime, default=datetime.utcnow)
     due_date = Column(DateTime, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # the owner's users.debts_version as of the last write to this row (delta sync position)
+    version = Column(Integer, nullable=False, default=0, server_default="0")
 
     user = relationship("User", back_populates="debts")
+
+    __table_args__ = (
+        # keyset pagination for GET /api/debts/ walks (start_date, id) newest first
+        Index("ix_debts_user_start_id", user_id, start_date.desc(), id.desc()),
+        Index("ix_debts_user_type_start_id", user_id, debt_type, start_date.desc(), id.desc()),
+        Index("ix_debts_user_currency_start_id", user_id, currency, start_date.desc(), id.desc()),
+        # GET /api/debts/sync reads a user's changes in (version, id) order
+        Index("ix_debts_user_version_id", user_id, version, id),
+        # only debts with a due date are ever filtered/sorted by it (overdue, due ranges, reminders)
+        Index(
+            "ix_debts_user_due_open", user_id, due_date,
+            postgresql_where=due_date.isnot(None), sqlite_where=due_date.isnot(None),
+        ),
+        # also covers the per-counterparty rollup (group by person_name, currency) without table reads
+        Index(
+            "ix_debts_user_person_name", user_id, person_name, currency, debt_type, amount,
+            postgresql_ops={"person_name": "text_pattern_ops"},
+        ),
+    )
+
+# full-text search table/indexes and triggers (see search.py)
+search.attach_ddl(Debt.__table__)
+
+class UserBalance(Base):
+    """Per-user, per-currency running totals kept in sync by the debt write paths in crud."""
+    __tablename__ = "user_balances"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    currency = Column(String, primary_key=True)
+    owed_to = Column(Numeric(20, 4), nullable=False, default=0)
+    owed_by = Column(Numeric(20, 4), nullable=False, default=0)
+    debt_count = Column(Integer, nullable=False, default=0)
+
+class DebtTombstone(Base):
+    """A deleted debt, kept so delta sync clients learn about the delete; keyed in sync order."""
+    __tablename__ = "debt_tombstones"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, primary_key=True)
+    debt_id = Column(Integer, primary_key=True)
+    deleted_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class ReminderDelivery(Base):
+    """One row per sent reminder; the key makes a (user, occurrence) send happen at most once."""
+    __tablename__ = "reminder_deliveries"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    scheduled_for = Column(DateTime, primary_key=True)
+    sent_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    debt_count = Column(Integer, nullable=False, default=0)
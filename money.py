@@ -0,0 +1,53 @@
+"""
+Money amounts.
+
+Amounts are Decimal end to end: the schemas validate them, NUMERIC(20, 4)
+columns store them, and balances are summed in SQL without a float or int
+round trip. Each currency allows as many fractional digits as its ISO 4217
+minor unit (JPY none, USD two, KWD three, ...). In JSON they go out as
+numbers; inputs are capped at MAX_DIGITS significant digits so that the
+number a client parses as a double is the exact stored value. Sums past
+that (large aggregated balances) go out as integers when whole and as
+decimal strings otherwise, never as a rounded double.
+"""
+from decimal import Decimal
+from typing import Optional, Union
+
+# fractional digits the amount columns hold
+SCALE = 4
+# significant digits accepted on input; a double represents up to 15 exactly
+MAX_DIGITS = 15
+
+DEFAULT_EXPONENT = 2
+CURRENCY_EXPONENTS = {
+    "UZS": 2, "USD": 2, "EUR": 2, "RUB": 2, "KZT": 2, "GBP": 2, "CNY": 2, "TRY": 2,
+    "JPY": 0, "KRW": 0, "VND": 0,
+    "KWD": 3, "BHD": 3, "OMR": 3, "JOD": 3, "TND": 3,
+}
+
+
+def exponent(currency: Optional[str]) -> int:
+    """Number of fractional digits allowed for the currency"""
+    return CURRENCY_EXPONENTS.get((currency or "UZS").upper(), DEFAULT_EXPONENT)
+
+
+def check_scale(amount: Decimal, currency: Optional[str]) -> Decimal:
+    """Return the amount unchanged, or raise ValueError if it is finer than the currency's minor unit"""
+    places = exponent(currency)
+    if amount != amount.quantize(Decimal(1).scaleb(-places)):
+        raise ValueError(f"{currency or 'UZS'} amounts allow at most {places} decimal places")
+    return amount
+
+
+def quantize(amount: Decimal, currency: Optional[str]) -> Decimal:
+    """Round a computed amount (e.g. a converted total) to the currency's minor unit"""
+    return amount.quantize(Decimal(1).scaleb(-exponent(currency)))
+
+
+def to_json_number(amount: Decimal) -> Union[int, float, str]:
+    """JSON value for an amount: an int when whole, a float when that is exact, else the decimal string"""
+    value = float(amount)
+    # within MAX_DIGITS the float is always exact; the digit count is the cheap test on large lists
+    if len(amount.as_tuple().digits) > MAX_DIGITS and Decimal(repr(value)) != amount:
+        return int(amount) if amount == amount.to_integral_value() else format(amount.normalize(), "f")
+    return int(value) if value.is_integer() else value
@@ -0,0 +1,144 @@
+"""
+Per-request SQL profiling.
+
+Engine-level cursor events time every statement; an ASGI middleware gives
+each request its own collector (through a context variable, which the
+threadpool and AsyncSession.run_sync both carry over) and reports what it
+saw as a Server-Timing header and one structured log line per request.
+Statements slower than SLOW_QUERY_MS are logged on their own, with their
+query plan when DEBUG is on.
+"""
+import json
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+load_dotenv()
+
+SQL_PROFILE = os.getenv("SQL_PROFILE", "True").lower() == "true"
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 100))
+DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+# how many of the slowest statements to keep per request
+PROFILE_TOP_STATEMENTS = 3
+
+logger = logging.getLogger("debtmanager.sql")
+
+_current: ContextVar[Optional["RequestProfile"]] = ContextVar("sql_profile", default=None)
+
+
+class RequestProfile:
+    __slots__ = ("count", "db_time", "slowest")
+
+    def __init__(self):
+        self.count = 0
+        self.db_time = 0.0
+        self.slowest: List[Tuple[float, str]] = []
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.db_time += elapsed
+        if len(self.slowest) < PROFILE_TOP_STATEMENTS or elapsed > self.slowest[-1][0]:
+            self.slowest.append((elapsed, statement))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[PROFILE_TOP_STATEMENTS:]
+
+    def server_timing(self, total: float) -> str:
+        return f'db;dur={self.db_time * 1000:.2f};desc="{self.count} queries", app;dur={total * 1000:.2f}'
+
+
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    prefixes = {"sqlite": "EXPLAIN QUERY PLAN ", "postgresql": "EXPLAIN "}
+    prefix = prefixes.get(conn.dialect.name)
+    if not prefix or not statement.lstrip().upper().startswith("SELECT"):
+        return None
+    # raw DBAPI cursor: does not go through the engine events again
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return "\n".join(" ".join(str(col) for col in row) for row in cursor.fetchall())
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+    finally:
+        cursor.close()
+
+
+# the start time lives on the execution context, which is dropped with the statement even
+# when it raises, so nothing is left behind on pooled connections
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._profile_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_profile_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    profile = _current.get()
+    if profile is not None:
+        profile.record(statement, elapsed)
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        entry = {"event": "slow_query", "ms": round(elapsed * 1000, 2), "sql": statement}
+        if DEBUG and not executemany:
+            entry["plan"] = _explain(conn, statement, parameters)
+        logger.warning(json.dumps(entry))
+
+
+def install():
+    """Hook the cursor events on every Engine (sync engines and the ones behind AsyncEngine)"""
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+class SQLProfilerMiddleware:
+    """Adds Server-Timing (db time, query count) and logs one JSON line per request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not SQL_PROFILE:
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current.set(profile)
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            logger.info(json.dumps({
+                "event": "request",
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "ms": round((time.perf_counter() - start) * 1000, 2),
+                "db_queries": profile.count,
+                "db_ms": round(profile.db_time * 1000, 2),
+                "slowest": [{"ms": round(t * 1000, 2), "sql": sql[:200]} for t, sql in profile.slowest],
+            }))
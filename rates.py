@@ -0,0 +1,151 @@
+"""
+Exchange rates for the consolidated monitoring total.
+
+The table is loaded from EXCHANGE_RATES_FILE or EXCHANGE_RATES_URL, a JSON
+document of the form
+
+    {"base": "USD", "version": "2026-10-18", "rates": {"UZS": 12650, "EUR": 0.92}}
+
+where each rate is the number of units of that currency per one unit of
+base ("version" is optional; a content hash is used otherwise). It is kept
+in process and reloaded after EXCHANGE_RATES_TTL seconds; when a reload
+fails the previous table stays in use. The version is exposed so callers
+(and HTTP caches) can tell which rates a converted figure was based on.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import urllib.request
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Optional
+
+from dotenv import load_dotenv
+
+import money
+
+load_dotenv()
+
+logger = logging.getLogger("debtmanager.rates")
+
+EXCHANGE_RATES_FILE = os.getenv("EXCHANGE_RATES_FILE")
+EXCHANGE_RATES_URL = os.getenv("EXCHANGE_RATES_URL")
+EXCHANGE_RATES_TTL = float(os.getenv("EXCHANGE_RATES_TTL") or 3600)
+EXCHANGE_RATES_TIMEOUT = float(os.getenv("EXCHANGE_RATES_TIMEOUT") or 5)
+
+
+class RateTable:
+    def __init__(self, base: str, rates: Dict[str, Decimal], version: str):
+        self.base = base
+        self.rates = dict(rates)
+        self.rates[base] = Decimal(1)
+        self.version = version
+
+    def rate(self, from_currency: str, to_currency: str) -> Optional[Decimal]:
+        """Units of to_currency per one unit of from_currency, or None if either is unknown"""
+        src, dst = self.rates.get(from_currency), self.rates.get(to_currency)
+        if src is None or dst is None:
+            return None
+        return dst / src
+
+    def rates_to(self, target: str, currencies: Iterable[str]) -> Dict[str, Optional[Decimal]]:
+        """One rate per distinct currency, for converting a set of totals into `target`"""
+        return {code: self.rate(code, target) for code in set(currencies)}
+
+
+EMPTY = RateTable("", {}, "none")
+
+
+def parse_rates(raw: bytes) -> RateTable:
+    doc = json.loads(raw)
+    base = doc["base"]
+    rates = {}
+    for code, value in doc["rates"].items():
+        try:
+            rate = Decimal(str(value))
+        except InvalidOperation:
+            raise ValueError(f"Invalid rate for {code}: {value!r}")
+        if rate <= 0:
+            raise ValueError(f"Invalid rate for {code}: {value!r}")
+        rates[code] = rate
+    version = str(doc.get("version") or hashlib.sha256(raw).hexdigest()[:12])
+    return RateTable(base, rates, version)
+
+
+def _read_source() -> Optional[bytes]:
+    if EXCHANGE_RATES_FILE:
+        with open(EXCHANGE_RATES_FILE, "rb") as f:
+            return f.read()
+    if EXCHANGE_RATES_URL:
+        with urllib.request.urlopen(EXCHANGE_RATES_URL, timeout=EXCHANGE_RATES_TIMEOUT) as r:
+            return r.read()
+    return None
+
+
+_table: RateTable = EMPTY
+_expires_at = 0.0
+_lock = threading.Lock()
+
+
+def get_rates() -> RateTable:
+    """The current rate table, reloaded from the source once the TTL has passed"""
+    global _table, _expires_at
+    if time.monotonic() < _expires_at:
+        return _table
+    with _lock:
+        if time.monotonic() < _expires_at:
+            return _table
+        try:
+            raw = _read_source()
+            if raw is not None:
+                _table = parse_rates(raw)
+        except Exception:
+            # keep serving the last good table; try again after the next TTL
+            logger.warning("Error loading exchange rates; keeping version %s", _table.version, exc_info=True)
+        _expires_at = time.monotonic() + EXCHANGE_RATES_TTL
+        return _table
+
+
+def set_rates(table: RateTable):
+    """Install a table directly (tests, or a caller that fetched rates itself)"""
+    global _table, _expires_at
+    with _lock:
+        _table = table
+        _expires_at = time.monotonic() + EXCHANGE_RATES_TTL
+
+
+def invalidate():
+    """Force a reload on the next get_rates()"""
+    global _expires_at
+    with _lock:
+        _expires_at = 0.0
+
+
+def consolidate(summary, target: str, table: Optional[RateTable] = None) -> Dict:
+    """
+    Convert per-currency monitoring rows into one total in `target`.
+    
+    Uses one rate per currency row (not per debt). Currencies without a
+    rate are left out of the total and listed under missing_rates.
+    """
+    table = table or get_rates()
+    rates = table.rates_to(target, (row["currency"] for row in summary))
+    owed_to = owed_by = Decimal(0)
+    missing = []
+    for row in summary:
+        rate = rates[row["currency"]]
+        if rate is None:
+            missing.append(row["currency"])
+            continue
+        owed_to += rate * row["total_owed_to"]
+        owed_by += rate * row["total_owed_by"]
+    return {
+        "currency": target,
+        "total_owed_to": money.quantize(owed_to, target),
+        "total_owed_by": money.quantize(owed_by, target),
+        "balance": money.quantize(owed_to - owed_by, target),
+        "rates_version": table.version,
+        "missing_rates": sorted(missing),
+    }
@@ -0,0 +1,186 @@
+"""
+Daily debt reminders.
+
+Each user's Setting carries next_reminder_at, the next UTC occurrence of
+their reminder_time (kept by crud.upsert_setting). A scheduler pass pages
+through the settings that are due using the partial index on that column,
+hands each page to a worker pool, and per page: loads the overdue and
+soon-due debts with one query, claims the deliveries (the
+reminder_deliveries key makes each occurrence send at most once, across
+restarts and concurrent schedulers), advances next_reminder_at and then
+emits one event per user to the configured sink.
+
+Run it with `python manage.py run-reminders`, or set REMINDER_SCHEDULER=True
+to run it in a background thread of the API process.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from dotenv import load_dotenv
+
+import crud, database, money
+
+load_dotenv()
+
+# log | file:<path> | queue
+REMINDER_SINK = os.getenv("REMINDER_SINK") or "log"
+# debts due within this many hours (and all overdue ones) go into a reminder
+REMINDER_LOOKAHEAD_HOURS = float(os.getenv("REMINDER_LOOKAHEAD_HOURS") or 24)
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE") or 200)
+REMINDER_WORKERS = int(os.getenv("REMINDER_WORKERS") or 4)
+REMINDER_INTERVAL_SECONDS = float(os.getenv("REMINDER_INTERVAL_SECONDS") or 60)
+REMINDER_SCHEDULER = os.getenv("REMINDER_SCHEDULER", "False").lower() == "true"
+
+logger = logging.getLogger("debtmanager.reminders")
+
+
+# --- Sinks ---
+class LogSink:
+    def emit(self, event: Dict[str, Any]):
+        logger.info(json.dumps(event))
+
+
+class FileSink:
+    """Appends one JSON line per reminder"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, event: Dict[str, Any]):
+        line = json.dumps(event) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class QueueSink:
+    """Puts events on an in-process queue for a consumer in the same process"""
+
+    def __init__(self, q: Optional[queue.Queue] = None):
+        self.queue = q if q is not None else queue.Queue()
+
+    def emit(self, event: Dict[str, Any]):
+        self.queue.put(event)
+
+
+# shared by every QueueSink built from REMINDER_SINK=queue
+reminder_queue: queue.Queue = queue.Queue()
+
+
+def get_sink(spec: Optional[str] = None):
+    spec = spec or REMINDER_SINK
+    if spec == "log":
+        return LogSink()
+    if spec == "queue":
+        return QueueSink(reminder_queue)
+    if spec.startswith("file:"):
+        return FileSink(spec[len("file:"):])
+    raise ValueError(f"Unknown reminder sink: {spec}")
+
+
+# --- Scheduler ---
+def _debt_entry(d) -> Dict[str, Any]:
+    return {
+        "id": d.id,
+        "debt_type": d.debt_type.value,
+        "person_name": d.person_name,
+        "amount": money.to_json_number(d.amount),
+        "currency": d.currency,
+        "due_date": d.due_date.isoformat(),
+    }
+
+
+def _process_batch(settings, now: datetime, sink) -> int:
+    """Claim, record and emit reminders for one page of due settings; returns the number sent"""
+    until = now + timedelta(hours=REMINDER_LOOKAHEAD_HOURS)
+    db = database.SessionLocal()
+    try:
+        debts = crud.get_reminder_debts(db, [s.user_id for s in settings], until)
+        claims = [
+            {"user_id": s.user_id, "scheduled_for": s.next_reminder_at, "debt_count": len(debts.get(s.user_id, []))}
+            for s in settings
+        ]
+        claimed = set(crud.claim_reminders(db, claims, now))
+    finally:
+        db.close()
+
+    sent = 0
+    for c in claims:
+        user_debts = debts.get(c["user_id"])
+        if c["user_id"] not in claimed or not user_debts:
+            continue
+        sink.emit({
+            "event": "debt_reminder",
+            "user_id": c["user_id"],
+            "scheduled_for": c["scheduled_for"].isoformat(),
+            "overdue": [_debt_entry(d) for d in user_debts if d.due_date < now],
+            "due_soon": [_debt_entry(d) for d in user_debts if d.due_date >= now],
+        })
+        sent += 1
+    return sent
+
+
+def run_due_reminders(
+    now: Optional[datetime] = None,
+    sink=None,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> int:
+    """One scheduler pass over every reminder due at `now`; returns the number of reminders sent"""
+    now = now or datetime.utcnow()
+    sink = sink or get_sink()
+    batch_size = batch_size or REMINDER_BATCH_SIZE
+    workers = workers or REMINDER_WORKERS
+
+    futures = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reminders") as pool:
+        db = database.SessionLocal()
+        try:
+            after = None
+            while True:
+                page = crud.get_due_reminder_settings(db, now, after=after, limit=batch_size)
+                if not page:
+                    break
+                futures.append(pool.submit(_process_batch, page, now, sink))
+                after = (page[-1].next_reminder_at, page[-1].user_id)
+                if len(page) < batch_size:
+                    break
+        finally:
+            db.close()
+    return sum(f.result() for f in futures)
+
+
+class ReminderScheduler:
+    """Runs run_due_reminders every `interval` seconds on a daemon thread"""
+
+    def __init__(self, interval: Optional[float] = None, sink=None):
+        self.interval = interval or REMINDER_INTERVAL_SECONDS
+        self.sink = sink
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="reminder-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                sent = run_due_reminders(sink=self.sink)
+                if sent:
+                    logger.info(json.dumps({"event": "reminder_pass", "sent": sent}))
+            except Exception:
+                # keep the scheduler alive; the next pass retries whatever was left unclaimed
+                logger.exception("Error in reminder scheduler")
+            self._stop.wait(self.interval)
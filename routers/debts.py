@@ -1,15 +1,161 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
+from datetime import datetime
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
-import schemas, crud, database, auth
+from sqlalchemy.ext.asyncio import AsyncSession
+import os
+import schemas, crud, crud_async, database, auth, utils, debt_io, conditional
 
 router = APIRouter(prefix="/api/debts", tags=["debts"])
 
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", 1000))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", 1000))
+
 @router.post("/", response_model=schemas.DebtResponse, status_code=201)
 def add_debt(payload: schemas.DebtCreate, current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     d = crud.create_debt(db, payload, current_user.id)
     return d
 
+@router.post("/import", response_model=schemas.DebtImportResult)
+async def import_debts(request: Request, current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    """
+    Bulk import debts from a JSON array, NDJSON (application/x-ndjson) or
+    CSV (text/csv, header row with DebtCreate field names). Rows are
+    validated one by one and inserted in batches of IMPORT_BATCH_SIZE, each
+    in its own transaction; invalid rows are reported, not fatal.
+    """
+    result = schemas.DebtImportResult()
+
+    def reject(row: int, errors: List[str]):
+        result.failed += 1
+        if len(result.errors) < IMPORT_MAX_ERRORS:
+            result.errors.append(schemas.DebtImportError(row=row, errors=errors))
+
+    async def flush(batch, rows):
+        try:
+            result.imported += await run_in_threadpool(crud.bulk_create_debts, db, current_user.id, batch)
+        except SQLAlchemyError as e:
+            await run_in_threadpool(db.rollback)
+            for row in rows:
+                reject(row, [f"batch failed: {e.__class__.__name__}"])
+
+    batch, rows = [], []
+    async for row, record in debt_io.iter_import_records(request):
+        try:
+            batch.append(debt_io.parse_debt_record(record))
+            rows.append(row)
+        except debt_io.ImportRowError as e:
+            reject(row, e.errors)
+            continue
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            await flush(batch, rows)
+            batch, rows = [], []
+    if batch:
+        await flush(batch, rows)
+    return result
+
+@router.post("/batch", response_model=schemas.DebtBatchResponse)
+def batch_debts(payload: schemas.DebtBatchRequest, current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    """
+    Apply many create/update/delete operations in one request and one
+    transaction. Operations run in order; each gets its own result, and an
+    invalid or missing target does not stop the others.
+    """
+    operations, results = _parse_batch(payload)
+    applied = crud.apply_debt_batch(db, current_user.id, [op for _, op in operations])
+    return _batch_response(payload, operations, applied, results)
+
+def _parse_batch(payload: schemas.DebtBatchRequest):
+    operations, results = [], {}
+    for i, item in enumerate(payload.operations):
+        try:
+            if item.op != "create" and item.id is None:
+                raise debt_io.ImportRowError(["id: required for update and delete"])
+            if item.op == "create":
+                parsed = debt_io.parse_debt_record(item.data or {})
+            elif item.op == "update":
+                parsed = debt_io.parse_debt_update(item.data or {})
+            else:
+                parsed = None
+        except debt_io.ImportRowError as e:
+            results[i] = schemas.DebtBatchResult(index=i, op=item.op, status="invalid", id=item.id, errors=e.errors)
+            continue
+        operations.append((i, (item.op, item.id, parsed)))
+    return operations, results
+
+def _batch_response(payload, operations, applied, results):
+    for (i, (op, debt_id, _)), (status, debt) in zip(operations, applied):
+        if status == "invalid":
+            results[i] = schemas.DebtBatchResult(index=i, op=op, status=status, id=debt_id, errors=debt)
+            continue
+        results[i] = schemas.DebtBatchResult(
+            index=i, op=op, status=status, id=debt.id if debt else debt_id, debt=debt
+        )
+    return {"results": [results[i] for i in range(len(payload.operations))]}
+
+@router.get("/export")
+def export_debts(format: str = Query("ndjson", pattern="^(ndjson|csv)$"), current_user = Depends(auth.get_current_user)):
+    """
+    Download every debt as NDJSON or CSV. The body is streamed from a
+    server-side cursor, so memory use does not depend on the number of rows.
+    """
+    return StreamingResponse(
+        debt_io.stream_export(current_user.id, format),
+        media_type=debt_io.EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="debts.{format}"'},
+    )
+
+@router.get("/search", response_model=List[schemas.DebtResponse])
+def search_debts(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in person_name / description"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    current_user = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db),
+):
+    """
+    Ranked search over person_name and description. When more results exist
+    the response carries X-Next-Offset; pass it back as `offset`.
+    """
+    debts = crud.search_debts(db, current_user.id, q, limit=limit + 1, offset=offset)
+    return _paginate_offset(response, debts, limit, offset)
+
+@router.get("/sync", response_model=schemas.DebtSyncResponse)
+def sync_debts(
+    cursor: Optional[str] = Query(None, description="`cursor` from the previous sync; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    current_user = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db),
+):
+    """
+    Debts created, updated or deleted since `cursor`, oldest change first.
+    Without a cursor every debt is returned. Keep syncing while `has_more`
+    is true, then store the returned `cursor` for next time.
+    """
+    changes = crud.get_debt_changes(db, current_user.id, after=_decode_sync_cursor(cursor), limit=limit)
+    return _sync_response(*changes)
+
+def _decode_sync_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    try:
+        return utils.decode_sync_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _sync_response(changed, deleted, position, has_more: bool):
+    return {"changed": changed, "deleted": deleted, "cursor": utils.encode_sync_cursor(*position), "has_more": has_more}
+
+def _paginate_offset(response: Response, debts, limit: int, offset: int):
+    if len(debts) > limit:
+        debts = debts[:limit]
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return debts
+
 @router.patch("/{debt_id}", response_model=schemas.DebtResponse)
 def partial_update_debt(debt_id: int, payload: schemas.DebtUpdate, current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     """
@@ -28,6 +174,133 @@ def remove_debt(debt_id: int, current_user = Depends(auth.get_current_user), db:
     return
 
 @router.get("/", response_model=List[schemas.DebtResponse])
-def list_debts(debt_type: Optional[str] = Query(None), current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    debts = crud.get_user_debts(db, current_user.id, debt_type=debt_type)
+def list_debts(
+    request: Request,
+    response: Response,
+    debt_type: Optional[str] = Query(None),
+    currency: Optional[str] = Query(None),
+    due_from: Optional[datetime] = Query(None),
+    due_to: Optional[datetime] = Query(None),
+    overdue: bool = Query(False),
+    person_name: Optional[str] = Query(None, description="Person name prefix"),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db),
+):
+    """
+    List debts newest first. When more rows are available the response
+    carries an X-Next-Cursor header; pass it back as `cursor` for the next page.
+    
+    Responses carry an ETag and Last-Modified; a request whose If-None-Match
+    still matches gets an empty 304 without the debts being read.
+    """
+    if not overdue:
+        not_modified = _check_debts_version(request, response, current_user.id, crud.get_version_stamp(db, current_user.id))
+        if not_modified:
+            return not_modified
+    debts = crud.get_user_debts(
+        db, current_user.id,
+        debt_type=debt_type, currency=currency,
+        due_from=due_from, due_to=due_to, overdue=overdue,
+        person_name=person_name, after=_decode_cursor(cursor), limit=limit + 1,
+    )
+    return _paginate(response, debts, limit)
+
+def _check_debts_version(request: Request, response: Response, user_id: int, stamp):
+    # ?overdue= depends on the clock as well as the data, so it is never answered with 304
+    return conditional.check(request, response, *conditional.debts_validators(user_id, stamp))
+
+def _decode_cursor(cursor: Optional[str]):
+    if not cursor:
+        return None
+    try:
+        return utils.decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _paginate(response: Response, debts, limit: int):
+    # one extra row was fetched to tell whether another page exists
+    if len(debts) > limit:
+        debts = debts[:limit]
+        last = debts[-1]
+        response.headers["X-Next-Cursor"] = utils.encode_cursor(last.start_date, last.id)
     return debts
+
+
+# Async twins of the handlers above. main.py mounts them ahead of `router`
+# when DB_ASYNC is enabled; endpoints without a twin keep using `router`.
+async_router = APIRouter(prefix="/api/debts", tags=["debts"])
+
+@async_router.post("/", response_model=schemas.DebtResponse, status_code=201)
+async def add_debt_async(payload: schemas.DebtCreate, current_user = Depends(auth.get_current_user_async), db: AsyncSession = Depends(database.get_async_db)):
+    return await crud_async.create_debt(db, payload, current_user.id)
+
+@async_router.post("/batch", response_model=schemas.DebtBatchResponse)
+async def batch_debts_async(payload: schemas.DebtBatchRequest, current_user = Depends(auth.get_current_user_async), db: AsyncSession = Depends(database.get_async_db)):
+    operations, results = _parse_batch(payload)
+    applied = await crud_async.apply_debt_batch(db, current_user.id, [op for _, op in operations])
+    return _batch_response(payload, operations, applied, results)
+
+@async_router.get("/search", response_model=List[schemas.DebtResponse])
+async def search_debts_async(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    current_user = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(database.get_async_db),
+):
+    debts = await crud_async.search_debts(db, current_user.id, q, limit=limit + 1, offset=offset)
+    return _paginate_offset(response, debts, limit, offset)
+
+@async_router.get("/sync", response_model=schemas.DebtSyncResponse)
+async def sync_debts_async(
+    cursor: Optional[str] = Query(None, description="`cursor` from the previous sync; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    current_user = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(database.get_async_db),
+):
+    changes = await crud_async.get_debt_changes(db, current_user.id, after=_decode_sync_cursor(cursor), limit=limit)
+    return _sync_response(*changes)
+
+@async_router.patch("/{debt_id}", response_model=schemas.DebtResponse)
+async def partial_update_debt_async(debt_id: int, payload: schemas.DebtUpdate, current_user = Depends(auth.get_current_user_async), db: AsyncSession = Depends(database.get_async_db)):
+    d = await crud_async.update_debt(db, debt_id, current_user.id, payload)
+    if not d:
+        raise HTTPException(status_code=404, detail="Debt not found")
+    return d
+
+@async_router.delete("/{debt_id}", status_code=204)
+async def remove_debt_async(debt_id: int, current_user = Depends(auth.get_current_user_async), db: AsyncSession = Depends(database.get_async_db)):
+    ok = await crud_async.delete_debt(db, debt_id, current_user.id)
+    if not ok:
+        raise HTTPException(status_code=404, detail="Debt not found")
+    return
+
+@async_router.get("/", response_model=List[schemas.DebtResponse])
+async def list_debts_async(
+    request: Request,
+    response: Response,
+    debt_type: Optional[str] = Query(None),
+    currency: Optional[str] = Query(None),
+    due_from: Optional[datetime] = Query(None),
+    due_to: Optional[datetime] = Query(None),
+    overdue: bool = Query(False),
+    person_name: Optional[str] = Query(None, description="Person name prefix"),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(database.get_async_db),
+):
+    if not overdue:
+        not_modified = _check_debts_version(request, response, current_user.id, await crud_async.get_version_stamp(db, current_user.id))
+        if not_modified:
+            return not_modified
+    debts = await crud_async.get_user_debts(
+        db, current_user.id,
+        debt_type=debt_type, currency=currency,
+        due_from=due_from, due_to=due_to, overdue=overdue,
+        person_name=person_name, after=_decode_cursor(cursor), limit=limit + 1,
+    )
+    return _paginate(response, debts, limit)
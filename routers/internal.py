@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import Optional
+import hmac
+import os
+import cache, database, metrics
+
+# Operational endpoints, served only with an X-Internal-Token header matching
+# INTERNAL_API_TOKEN; while no token is configured they refuse every request
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN")
+
+def require_internal_token(x_internal_token: Optional[str] = Header(None)):
+    if not INTERNAL_API_TOKEN or not x_internal_token or not hmac.compare_digest(x_internal_token, INTERNAL_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+
+router = APIRouter(prefix="/internal", tags=["internal"], dependencies=[Depends(require_internal_token)])
+
+# Prometheus scrape target, kept off /internal so the conventional path works
+metrics_router = APIRouter(tags=["internal"], dependencies=[Depends(require_internal_token)])
+
+@router.get("/pool")
+def pool_status():
+    """Connection pool occupancy and checkout wait times, for sizing DB_POOL_*"""
+    status = {"sync": database.get_pool_status(database.engine)}
+    if database.async_engine is not None:
+        status["async"] = database.get_pool_status(database.async_engine.sync_engine)
+    return status
+
+@router.get("/caches")
+def cache_status():
+    """Size and hit/miss counters of the in-process caches"""
+    return {"auth_users": cache.user_cache.stats(), "jwt": cache.token_cache.stats()}
+
+@metrics_router.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type=metrics.CONTENT_TYPE)
@@ -1,10 +1,77 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
 from sqlalchemy.orm import Session
-import crud, database, auth
+from sqlalchemy.ext.asyncio import AsyncSession
+import crud, crud_async, database, auth, schemas, conditional, rates
 
 router = APIRouter(prefix="/api/monitoring", tags=["monitoring"])
 
-@router.get("/")
-def monitoring_summary(current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
-    summary = crud.get_monitoring_summary(db, current_user.id)
-    return {"summary": summary}
+@router.get("/", response_model=schemas.MonitoringResponse)
+def monitoring_summary(request: Request, response: Response, current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    not_modified = _check_monitoring_version(request, response, current_user.id, crud.get_version_stamp(db, current_user.id))
+    if not_modified:
+        return not_modified
+    return crud.get_monitoring_overview(db, current_user.id)
+
+def _check_monitoring_version(request: Request, response: Response, user_id: int, stamp):
+    validators = conditional.monitoring_validators(user_id, stamp, rates.get_rates().version)
+    return conditional.check(request, response, *validators)
+
+@router.get("/counterparties", response_model=List[schemas.CounterpartyRollup])
+def counterparties(
+    response: Response,
+    currency: Optional[str] = Query(None, description="Only debts in this currency"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    current_user = Depends(auth.get_current_user),
+    db: Session = Depends(database.get_db),
+):
+    """
+    Net position per person, largest exposure first. When more people
+    follow, the response carries X-Next-Offset; pass it back as `offset`.
+    """
+    entries, has_more = crud.get_counterparty_rollups(db, current_user.id, limit=limit, offset=offset, currency=currency)
+    return _page(response, entries, has_more, limit, offset)
+
+@router.get("/counterparties/{person_name:path}", response_model=schemas.CounterpartyRollup)
+def counterparty(person_name: str, current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    entries, _ = crud.get_counterparty_rollups(db, current_user.id, limit=1, person_name=person_name)
+    return _single(entries)
+
+def _page(response: Response, entries, has_more: bool, limit: int, offset: int):
+    if has_more:
+        response.headers["X-Next-Offset"] = str(offset + limit)
+    return entries
+
+def _single(entries):
+    if not entries:
+        raise HTTPException(status_code=404, detail="No debts with this person")
+    return entries[0]
+
+
+# Async twin, mounted ahead of `router` when DB_ASYNC is enabled
+async_router = APIRouter(prefix="/api/monitoring", tags=["monitoring"])
+
+@async_router.get("/", response_model=schemas.MonitoringResponse)
+async def monitoring_summary_async(request: Request, response: Response, current_user = Depends(auth.get_current_user_async), db: AsyncSession = Depends(database.get_async_db)):
+    not_modified = _check_monitoring_version(request, response, current_user.id, await crud_async.get_version_stamp(db, current_user.id))
+    if not_modified:
+        return not_modified
+    return await crud_async.get_monitoring_overview(db, current_user.id)
+
+@async_router.get("/counterparties", response_model=List[schemas.CounterpartyRollup])
+async def counterparties_async(
+    response: Response,
+    currency: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    current_user = Depends(auth.get_current_user_async),
+    db: AsyncSession = Depends(database.get_async_db),
+):
+    entries, has_more = await crud_async.get_counterparty_rollups(db, current_user.id, limit=limit, offset=offset, currency=currency)
+    return _page(response, entries, has_more, limit, offset)
+
+@async_router.get("/counterparties/{person_name:path}", response_model=schemas.CounterpartyRollup)
+async def counterparty_async(person_name: str, current_user = Depends(auth.get_current_user_async), db: AsyncSession = Depends(database.get_async_db)):
+    entries, _ = await crud_async.get_counterparty_rollups(db, current_user.id, limit=1, person_name=person_name)
+    return _single(entries)
@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlalchemy.orm import Session
-import schemas, crud, database, auth
+from sqlalchemy.ext.asyncio import AsyncSession
+import schemas, crud, crud_async, database, auth, conditional
 
 router = APIRouter(prefix="/api/settings", tags=["settings"])
 
 @router.get("/", response_model=schemas.SettingResponse)
-def read_settings(current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+def read_settings(request: Request, response: Response, current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
+    not_modified = _check_settings_version(request, response, current_user.id, crud.get_version_stamp(db, current_user.id))
+    if not_modified:
+        return not_modified
     s = crud.get_setting(db, current_user.id)
     if not s:
         raise HTTPException(status_code=404, detail="Settings not found")
@@ -15,3 +19,24 @@ def read_settings(current_user = Depends(auth.get_current_user), db: Session = D
 def update_settings(payload: schemas.SettingUpdate, current_user = Depends(auth.get_current_user), db: Session = Depends(database.get_db)):
     s = crud.upsert_setting(db, current_user.id, payload)
     return s
+
+def _check_settings_version(request: Request, response: Response, user_id: int, stamp):
+    return conditional.check(request, response, *conditional.settings_validators(user_id, stamp))
+
+
+# Async twins, mounted ahead of `router` when DB_ASYNC is enabled
+async_router = APIRouter(prefix="/api/settings", tags=["settings"])
+
+@async_router.get("/", response_model=schemas.SettingResponse)
+async def read_settings_async(request: Request, response: Response, current_user = Depends(auth.get_current_user_async), db: AsyncSession = Depends(database.get_async_db)):
+    not_modified = _check_settings_version(request, response, current_user.id, await crud_async.get_version_stamp(db, current_user.id))
+    if not_modified:
+        return not_modified
+    s = await crud_async.get_setting(db, current_user.id)
+    if not s:
+        raise HTTPException(status_code=404, detail="Settings not found")
+    return s
+
+@async_router.patch("/", response_model=schemas.SettingResponse)
+async def update_settings_async(payload: schemas.SettingUpdate, current_user = Depends(auth.get_current_user_async), db: AsyncSession = Depends(database.get_async_db)):
+    return await crud_async.upsert_setting(db, current_user.id, payload)
@@ -1,39 +1,48 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-import schemas, crud, database, utils, models
+from sqlalchemy.ext.asyncio import AsyncSession
+import schemas, crud, crud_async, database, hashing, utils, models
 from utils import create_tokens, verify_token
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 @router.post("/register", response_model=schemas.UserResponse, status_code=201)
 def register(user_in: schemas.UserCreate, db: Session = Depends(database.get_db)):
-    # Check if username already exists
-    existing_user = db.query(models.User).filter(models.User.username == user_in.username).first()
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username already registered")
+    # One query for both checks; done before hashing so duplicates stay cheap
+    conflict = crud.find_user_conflict(db, user_in.username, user_in.email)
+    if conflict:
+        raise _already_registered(conflict)
     
-    # Check if email already exists (if provided)
-    if user_in.email:
-        existing_email = db.query(models.User).filter(models.User.email == user_in.email).first()
-        if existing_email:
-            raise HTTPException(status_code=400, detail="Email already registered")
-    
-    # Create the user
-    user = crud.create_user(db, user_in)
-    return user
+    # Create the user; the unique constraints catch a concurrent registration
+    try:
+        return crud.create_user(db, user_in)
+    except IntegrityError:
+        db.rollback()
+        raise _already_registered(crud.find_user_conflict(db, user_in.username, user_in.email) or "username")
+
+def _already_registered(field: str) -> HTTPException:
+    return HTTPException(status_code=400, detail=f"{field.capitalize()} already registered")
 
 @router.post("/login", response_model=schemas.TokenResponse)
 def login(login_data: schemas.UserLogin, db: Session = Depends(database.get_db)):
     # Find user by username
     user = crud.get_user_by_username(db, username=login_data.username)
-    if not user or not utils.verify_password(login_data.password, user.password_hash):
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = hashing.verify_and_update_password(login_data.password, user.password_hash)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Stored hash uses an old scheme or cost factor: replace it while we know the password
+    if new_hash:
+        crud.update_password_hash(db, user, new_hash)
+    
     # Create tokens
     access_token, refresh_token = utils.create_tokens(data={"sub": user.username})
     
@@ -90,3 +99,41 @@ def refresh_token(token_data: schemas.RefreshToken, db: Session = Depends(databa
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+
+# Async twins, mounted ahead of `router` when DB_ASYNC is enabled
+async_router = APIRouter(prefix="/api/auth", tags=["auth"])
+
+@async_router.post("/register", response_model=schemas.UserResponse, status_code=201)
+async def register_async(user_in: schemas.UserCreate, db: AsyncSession = Depends(database.get_async_db)):
+    conflict = await crud_async.find_user_conflict(db, user_in.username, user_in.email)
+    if conflict:
+        raise _already_registered(conflict)
+    try:
+        return await crud_async.create_user(db, user_in)
+    except IntegrityError:
+        await db.rollback()
+        raise _already_registered(await crud_async.find_user_conflict(db, user_in.username, user_in.email) or "username")
+
+@async_router.post("/login", response_model=schemas.TokenResponse)
+async def login_async(login_data: schemas.UserLogin, db: AsyncSession = Depends(database.get_async_db)):
+    user = await crud_async.get_user_by_username(db, username=login_data.username)
+    verified, new_hash = False, None
+    if user:
+        verified, new_hash = await hashing.verify_and_update_password_async(login_data.password, user.password_hash)
+    if not verified:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect username or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    if new_hash:
+        await crud_async.update_password_hash(db, user, new_hash)
+    
+    access_token, refresh_token = utils.create_tokens(data={"sub": user.username})
+    return {
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "token_type": "bearer"
+    }
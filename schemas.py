@@ -1,7 +1,13 @@
 # schemas.py
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, PlainSerializer, model_validator
+from typing import Annotated, Any, Dict, List, Literal, Optional, Union
 from datetime import datetime
+from decimal import Decimal
+import money
+
+# Decimal in Python, a plain JSON number on the wire
+Money = Annotated[Decimal, PlainSerializer(money.to_json_number, return_type=Union[int, float, str], when_used="json")]
+Amount = Annotated[Money, Field(max_digits=money.MAX_DIGITS, decimal_places=money.SCALE)]
 
 
 # --- User ---
@@ -53,7 +59,7 @@ class RefreshToken(BaseModel):
 # --- Debt ---
 class DebtBase(BaseModel):
     person_name: str
-    amount: float
+    amount: Amount
     currency: str = "UZS"
     description: Optional[str] = None
     debt_type: str  # 'owed_to' or 'owed_by'
@@ -61,16 +67,26 @@ class DebtBase(BaseModel):
 
 
 class DebtCreate(DebtBase):
-    pass
+    @model_validator(mode="after")
+    def check_amount_scale(self):
+        money.check_scale(self.amount, self.currency)
+        return self
 
 
 class DebtUpdate(BaseModel):
     person_name: Optional[str] = None
-    amount: Optional[float] = None
+    amount: Optional[Amount] = None
     currency: Optional[str] = None
     description: Optional[str] = None
     debt_type: Optional[str] = None  # 'owed_to' or 'owed_by'
     due_date: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def check_amount_scale(self):
+        # amount-only updates are checked against the stored currency in crud
+        if self.amount is not None and self.currency is not None:
+            money.check_scale(self.amount, self.currency)
+        return self
     
     model_config = {
         "json_schema_extra": {
@@ -87,15 +103,73 @@ class DebtUpdate(BaseModel):
 
 
 class DebtResponse(DebtBase):
+    # stored values were checked on the way in; skip the digit constraints on the way out
+    amount: Money
     id: int
     user_id: int
     created_at: datetime
     start_date: datetime
     due_date: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    version: int = 0
 
     model_config = {"from_attributes": True}
 
 
+class DebtImportError(BaseModel):
+    row: int
+    errors: List[str]
+
+
+class DebtImportResult(BaseModel):
+    imported: int = 0
+    failed: int = 0
+    # capped; `failed` always has the full count
+    errors: List[DebtImportError] = []
+
+
+class DebtBatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = None  # required for update/delete
+    data: Optional[Dict[str, Any]] = None  # DebtCreate for create, DebtUpdate for update
+
+
+class DebtBatchRequest(BaseModel):
+    operations: List[DebtBatchOperation] = Field(..., max_length=1000)
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "operations": [
+                    {"op": "create", "data": {"person_name": "Ali", "amount": 50000, "debt_type": "owed_to"}},
+                    {"op": "update", "id": 12, "data": {"amount": 75000}},
+                    {"op": "delete", "id": 13}
+                ]
+            }
+        }
+    }
+
+
+class DebtBatchResult(BaseModel):
+    index: int
+    op: str
+    status: str  # created / updated / deleted / not_found / invalid
+    id: Optional[int] = None
+    debt: Optional[DebtResponse] = None
+    errors: Optional[List[str]] = None
+
+
+class DebtBatchResponse(BaseModel):
+    results: List[DebtBatchResult]
+
+
+class DebtSyncResponse(BaseModel):
+    changed: List[DebtResponse]  # created or updated since the cursor; upsert by id
+    deleted: List[int]  # ids deleted since the cursor
+    cursor: str  # pass back as `cursor` on the next sync
+    has_more: bool  # more changes are waiting; sync again right away
+
+
 # --- Setting ---
 class SettingBase(BaseModel):
     notifications_enabled: bool = True
@@ -120,6 +194,7 @@ class SettingUpdate(BaseModel):
 class SettingResponse(SettingBase):
     id: int
     user_id: int
+    next_reminder_at: Optional[datetime] = None
     
     model_config = {
         "from_attributes": True,
@@ -132,3 +207,36 @@ class SettingResponse(SettingBase):
             }
         }
     }
+
+
+# --- Monitoring ---
+class CurrencySummary(BaseModel):
+    currency: str
+    total_owed_to: Money
+    total_owed_by: Money
+    balance: Money
+
+
+class ConsolidatedTotal(CurrencySummary):
+    rates_version: str
+    # currencies left out of the total for lack of a rate
+    missing_rates: List[str] = []
+
+
+class MonitoringResponse(BaseModel):
+    summary: List[CurrencySummary]
+    consolidated: ConsolidatedTotal
+
+
+class CounterpartyCurrency(CurrencySummary):
+    debt_count: int
+
+
+class CounterpartyRollup(BaseModel):
+    person_name: str
+    debt_count: int
+    # owed_to + owed_by converted to consolidated.currency; what the list is sorted by.
+    # None when no currency of this person has a rate (see consolidated.missing_rates)
+    exposure: Optional[Money] = None
+    currencies: List[CounterpartyCurrency]
+    consolidated: ConsolidatedTotal
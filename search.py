@@ -0,0 +1,76 @@
+"""
+Full-text search over debts (person_name and description).
+
+SQLite uses an FTS5 external-content table, debts_fts, kept in step with
+debts by triggers and ranked with bm25 (a person_name hit weighs double).
+Postgres uses a GIN index on a 'simple' tsvector of both columns for word
+and prefix matches, plus a pg_trgm GIN index on person_name so misspelt
+names still match; rows rank by the better of ts_rank and similarity.
+
+The DDL is attached to the debts table here, so create_all builds it too;
+migration 0005 carries the same statements for migrated databases. A
+SQLite batch migration that rebuilds the debts table drops the triggers,
+so such a migration has to re-run SQLITE_DDL's triggers afterwards.
+"""
+import re
+from typing import List
+
+from sqlalchemy import DDL, event
+
+# index/table names created here, so autogenerate leaves them alone
+SEARCH_OBJECTS = ("debts_fts", "ix_debts_search_tsv", "ix_debts_person_name_trgm")
+
+# must match the expression the Postgres query filters on
+PG_DOCUMENT = "to_tsvector('simple', coalesce(person_name, '') || ' ' || coalesce(description, ''))"
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS debts_fts USING fts5("
+    "person_name, description, content='debts', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS debts_fts_ai AFTER INSERT ON debts BEGIN "
+    "INSERT INTO debts_fts(rowid, person_name, description) VALUES (new.id, new.person_name, new.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS debts_fts_ad AFTER DELETE ON debts BEGIN "
+    "INSERT INTO debts_fts(debts_fts, rowid, person_name, description) "
+    "VALUES ('delete', old.id, old.person_name, old.description); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS debts_fts_au AFTER UPDATE OF person_name, description ON debts BEGIN "
+    "INSERT INTO debts_fts(debts_fts, rowid, person_name, description) "
+    "VALUES ('delete', old.id, old.person_name, old.description); "
+    "INSERT INTO debts_fts(rowid, person_name, description) VALUES (new.id, new.person_name, new.description); "
+    "END",
+]
+
+POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_debts_search_tsv ON debts USING gin ({PG_DOCUMENT})",
+    "CREATE INDEX IF NOT EXISTS ix_debts_person_name_trgm ON debts USING gin (person_name gin_trgm_ops)",
+]
+
+
+def attach_ddl(table):
+    for statement in SQLITE_DDL:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in POSTGRES_DDL:
+        event.listen(table, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+    event.listen(table, "before_drop", DDL("DROP TABLE IF EXISTS debts_fts").execute_if(dialect="sqlite"))
+
+
+def include_name(name, type_, parent_names) -> bool:
+    """Alembic autogenerate filter: the search objects (and FTS5's shadow tables) are not in the models"""
+    return not (type_ in ("table", "index") and name and name.startswith(SEARCH_OBJECTS))
+
+
+def terms(query: str) -> List[str]:
+    """Lower-cased word tokens of a search string; everything else is dropped"""
+    return re.findall(r"\w+", query.lower())
+
+
+def sqlite_match(words: List[str]) -> str:
+    # every word must match, each as a prefix; quoting keeps FTS5 operators out
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def pg_tsquery(words: List[str]) -> str:
+    # \w+ tokens only, so nothing here can break the to_tsquery syntax
+    return " & ".join(f"{w}:*" for w in words)
@@ -1,17 +1,30 @@
 import os
 import tempfile
+from contextlib import contextmanager
 import pytest
+
+# cheap bcrypt for tests; must be set before utils is imported
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# /internal/* and /metrics refuse every request without a configured token
+os.environ.setdefault("INTERNAL_API_TOKEN", "test-internal-token")
+
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 import database, models
 from main import app
 
 # temporary sqlite db for tests
 SQLALCHEMY_TEST_DATABASE_URL = "sqlite:///:memory:"
 
-engine = create_engine(SQLALCHEMY_TEST_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# StaticPool keeps a single connection so every thread sees the same in-memory db
+engine = create_engine(
+    SQLALCHEMY_TEST_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
 # override get_db dependency
 def override_get_db():
@@ -34,3 +47,32 @@ app.dependency_overrides[database.get_db] = override_get_db
 def client():
     with TestClient(app) as c:
         yield c
+
+@pytest.fixture
+def internal_headers():
+    return {"X-Internal-Token": os.environ["INTERNAL_API_TOKEN"]}
+
+@pytest.fixture
+def db():
+    session = TestingSessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+@pytest.fixture
+def count_queries():
+    """Context manager collecting every SQL statement sent to the test database"""
+    @contextmanager
+    def counter():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", record)
+    return counter
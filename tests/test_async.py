@@ -0,0 +1,71 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import database, models
+from routers import users, debts, settings, monitoring
+
+
+@pytest.fixture(scope="module")
+def async_client(tmp_path_factory):
+    path = tmp_path_factory.mktemp("async") / "async.db"
+    sync_engine = create_engine(f"sqlite:///{path}")
+    models.Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+
+    async_engine = create_async_engine(database.to_async_url(f"sqlite:///{path}"))
+    session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with session_factory() as db:
+            yield db
+
+    app = FastAPI()
+    for module in (users, debts, settings, monitoring):
+        app.include_router(module.async_router)
+    app.dependency_overrides[database.get_async_db] = override_get_async_db
+    with TestClient(app) as c:
+        yield c
+
+
+def test_to_async_url():
+    assert database.to_async_url("postgresql://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert database.to_async_url("postgresql+psycopg2://u:p@h/db") == "postgresql+asyncpg://u:p@h/db"
+    assert database.to_async_url("sqlite:///./app.db") == "sqlite+aiosqlite:///./app.db"
+
+
+def test_async_request_path(async_client):
+    r = async_client.post("/api/auth/register", json={"username": "aio", "password": "aiopass"})
+    assert r.status_code == 201
+    r = async_client.post("/api/auth/register", json={"username": "aio", "password": "aiopass"})
+    assert r.status_code == 400
+    r = async_client.post("/api/auth/login", json={"username": "aio", "password": "aiopass"})
+    assert r.status_code == 200
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    r = async_client.post("/api/debts/", json={"debt_type": "owed_to", "person_name": "A", "amount": 70}, headers=headers)
+    assert r.status_code == 201
+    debt_id = r.json()["id"]
+    r = async_client.post("/api/debts/", json={"debt_type": "owed_by", "person_name": "B", "amount": 30}, headers=headers)
+    assert r.status_code == 201
+
+    r = async_client.patch(f"/api/debts/{debt_id}", json={"amount": 80}, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["amount"] == 80
+
+    r = async_client.get("/api/debts/", params={"limit": 1}, headers=headers)
+    assert len(r.json()) == 1
+    assert "X-Next-Cursor" in r.headers
+
+    r = async_client.get("/api/monitoring/", headers=headers)
+    assert r.json()["summary"] == [{"currency": "UZS", "total_owed_to": 80, "total_owed_by": 30, "balance": 50}]
+
+    r = async_client.get("/api/settings/", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["default_currency"] == "UZS"
+
+    assert async_client.delete(f"/api/debts/{debt_id}", headers=headers).status_code == 204
+    assert async_client.delete(f"/api/debts/{debt_id}", headers=headers).status_code == 404
+    assert async_client.get("/api/debts/", headers={"Authorization": "Bearer nope"}).status_code == 401
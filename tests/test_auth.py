@@ -1,6 +1,7 @@
 def test_register_and_token(client):
     # register
     resp = client.post("/api/auth/register", json={
+        "username":"testuser",
         "first_name":"Test",
         "last_name":"User",
         "email":"test@example.com",
@@ -11,7 +12,50 @@ def test_register_and_token(client):
     assert data["email"] == "test@example.com"
 
     # get token
-    resp = client.post("/api/auth/token", data={"username":"test@example.com", "password":"strongpass"})
+    resp = client.post("/api/auth/login", json={"username":"testuser", "password":"strongpass"})
     assert resp.status_code == 200
     tok = resp.json()
     assert "access_token" in tok
+    assert "refresh_token" in tok
+
+
+def test_password_hashing_back_pressure(client, monkeypatch):
+    import threading
+    import hashing
+
+    # every slot taken: new hashes must be rejected immediately
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(hashing, "_slots", slots)
+
+    resp = client.post("/api/auth/register", json={"username": "busy", "password": "busypass"})
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
+
+    slots.release()
+    resp = client.post("/api/auth/register", json={"username": "busy", "password": "busypass"})
+    assert resp.status_code == 201
+    resp = client.post("/api/auth/login", json={"username": "busy", "password": "busypass"})
+    assert resp.status_code == 200
+    resp = client.post("/api/auth/login", json={"username": "busy", "password": "wrong"})
+    assert resp.status_code == 401
+
+
+def test_login_rehashes_outdated_password_hash(client, db):
+    from passlib.hash import bcrypt
+    import models, utils
+
+    # stored with a different cost factor than the configured one
+    db.add(models.User(username="legacy", password_hash=bcrypt.using(rounds=utils.BCRYPT_ROUNDS + 1).hash("legacypass")))
+    db.commit()
+
+    resp = client.post("/api/auth/login", json={"username": "legacy", "password": "legacypass"})
+    assert resp.status_code == 200
+
+    db.expire_all()
+    user = db.query(models.User).filter_by(username="legacy").one()
+    assert not utils.pwd_context.needs_update(user.password_hash)
+    assert utils.verify_password("legacypass", user.password_hash)
+
+    resp = client.post("/api/auth/login", json={"username": "legacy", "password": "legacypass"})
+    assert resp.status_code == 200
@@ -0,0 +1,67 @@
+import time
+
+import cache
+
+
+def test_ttl_cache_lru_eviction_and_stats():
+    c = cache.TTLCache(maxsize=2, ttl=60)
+    c.set("a", 1)
+    c.set("b", 2)
+    assert c.get("a") == 1  # "b" is now least recently used
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert c.stats() == {"size": 2, "maxsize": 2, "hits": 3, "misses": 1, "evictions": 1, "hit_rate": 0.75}
+
+
+def test_ttl_cache_expiry():
+    c = cache.TTLCache(maxsize=10, ttl=0.05)
+    c.set("a", 1)
+    c.set("b", 2, expires_at=time.time() - 1)  # already expired: not stored
+    assert c.get("a") == 1
+    assert c.get("b") is None
+    time.sleep(0.06)
+    assert c.get("a") is None
+    assert len(c) == 0
+
+
+def test_authenticated_user_cache(client, internal_headers):
+    cache.user_cache.clear()
+    client.post("/api/auth/register", json={"username": "cached", "password": "cachedpass"})
+    r = client.post("/api/auth/login", json={"username": "cached", "password": "cachedpass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    before = cache.user_cache.stats()
+    assert client.get("/api/settings/", headers=headers).status_code == 200
+    assert client.get("/api/settings/", headers=headers).status_code == 200
+    after = cache.user_cache.stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+
+    cache.invalidate_user("cached")
+    assert cache.user_cache.get("cached") is None
+    assert client.get("/internal/caches", headers=internal_headers).json()["auth_users"]["maxsize"] == cache.AUTH_USER_CACHE_SIZE
+
+
+def test_verified_token_cache():
+    from datetime import timedelta
+    import pytest
+    from fastapi import HTTPException
+    import utils
+
+    cache.token_cache.clear()
+    token = utils.create_access_token({"sub": "tok"}, timedelta(minutes=5))
+    before = cache.token_cache.stats()
+    assert utils.verify_token(token)["sub"] == "tok"
+    assert utils.verify_token(token)["sub"] == "tok"
+    after = cache.token_cache.stats()
+    assert (after["misses"] - before["misses"], after["hits"] - before["hits"]) == (1, 1)
+
+    # a different (tampered) token never hits the cached entry
+    with pytest.raises(HTTPException):
+        utils.verify_token(token[:-2] + ("AA" if token[-2:] != "AA" else "BB"))
+
+    # refresh tokens are always verified from scratch
+    refresh = utils.create_refresh_token({"sub": "tok"})
+    utils.verify_token(refresh, is_refresh=True)
+    assert len(cache.token_cache) == 1
@@ -0,0 +1,86 @@
+from datetime import timedelta
+from decimal import Decimal
+from email.utils import format_datetime, parsedate_to_datetime
+
+import rates
+
+
+def _login(client, username):
+    client.post("/api/auth/register", json={"username": username, "password": "etagpass"})
+    r = client.post("/api/auth/login", json={"username": username, "password": "etagpass"})
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+def test_etags_follow_writes(client):
+    headers = _login(client, "etag-user")
+
+    r = client.get("/api/debts/", headers=headers)
+    assert r.status_code == 200
+    etag, last_modified = r.headers["ETag"], r.headers["Last-Modified"]
+    assert etag.startswith('W/"')
+    assert r.headers["Cache-Control"] == "private, no-cache"
+
+    r = client.get("/api/debts/", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["ETag"] == etag
+    r = client.get("/api/debts/", headers={**headers, "If-None-Match": f'"other", {etag}'})
+    assert r.status_code == 304
+    r = client.get("/api/debts/", headers={**headers, "If-Modified-Since": last_modified})
+    assert r.status_code == 304
+    earlier = format_datetime(parsedate_to_datetime(last_modified) - timedelta(seconds=1), usegmt=True)
+    assert client.get("/api/debts/", headers={**headers, "If-Modified-Since": earlier}).status_code == 200
+
+    monitoring = client.get("/api/monitoring/", headers=headers).headers["ETag"]
+    settings = client.get("/api/settings/", headers=headers).headers["ETag"]
+    assert len({etag, monitoring, settings}) == 3
+
+    # a debt write changes the debts and monitoring tags, not the settings one
+    debt = client.post("/api/debts/", json={"debt_type": "owed_to", "person_name": "Ali", "amount": 5}, headers=headers).json()
+    r = client.get("/api/debts/", headers={**headers, "If-None-Match": etag})
+    assert r.status_code == 200
+    assert [d["id"] for d in r.json()] == [debt["id"]]
+    etag = r.headers["ETag"]
+    assert client.get("/api/monitoring/", headers={**headers, "If-None-Match": monitoring}).status_code == 200
+    assert client.get("/api/settings/", headers={**headers, "If-None-Match": settings}).status_code == 304
+
+    for write in (
+        lambda: client.patch(f"/api/debts/{debt['id']}", json={"amount": 7}, headers=headers),
+        lambda: client.post("/api/debts/batch", json={"operations": [{"op": "update", "id": debt["id"], "data": {"amount": 8}}]}, headers=headers),
+        lambda: client.delete(f"/api/debts/{debt['id']}", headers=headers),
+    ):
+        assert write().status_code < 300
+        r = client.get("/api/debts/", headers={**headers, "If-None-Match": etag})
+        assert r.status_code == 200
+        etag = r.headers["ETag"]
+
+    # the settings tag moves with settings writes; monitoring also depends on the default currency
+    monitoring = client.get("/api/monitoring/", headers=headers).headers["ETag"]
+    client.patch("/api/settings/", json={"default_currency": "USD"}, headers=headers)
+    assert client.get("/api/settings/", headers={**headers, "If-None-Match": settings}).status_code == 200
+    assert client.get("/api/monitoring/", headers={**headers, "If-None-Match": monitoring}).status_code == 200
+    assert client.get("/api/debts/", headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    # other users never match
+    other = _login(client, "etag-other")
+    assert client.get("/api/debts/", headers={**other, "If-None-Match": etag}).status_code == 200
+
+
+def test_monitoring_etag_follows_rates(client):
+    headers = _login(client, "etag-rates")
+    previous = rates.get_rates()
+    try:
+        rates.set_rates(rates.RateTable("USD", {"UZS": Decimal(12000)}, "v1"))
+        etag = client.get("/api/monitoring/", headers=headers).headers["ETag"]
+        assert client.get("/api/monitoring/", headers={**headers, "If-None-Match": etag}).status_code == 304
+        rates.set_rates(rates.RateTable("USD", {"UZS": Decimal(12500)}, "v2"))
+        assert client.get("/api/monitoring/", headers={**headers, "If-None-Match": etag}).status_code == 200
+    finally:
+        rates.set_rates(previous)
+
+
+def test_overdue_list_is_never_not_modified(client):
+    headers = _login(client, "etag-overdue")
+    r = client.get("/api/debts/", params={"overdue": True}, headers=headers)
+    assert "ETag" not in r.headers
+    r = client.get("/api/debts/", params={"overdue": True}, headers={**headers, "If-None-Match": "*"})
+    assert r.status_code == 200
@@ -1,14 +1,17 @@
 from datetime import datetime, timedelta
+import pytest
+import utils
 
 def get_auth_header(client):
     # ensure user exists
     client.post("/api/auth/register", json={
+        "username":"debtuser",
         "first_name":"Debt",
         "last_name":"User",
         "email":"debtuser@example.com",
         "password":"pass123"
     })
-    r = client.post("/api/auth/token", data={"username":"debtuser@example.com", "password":"pass123"})
+    r = client.post("/api/auth/login", json={"username":"debtuser", "password":"pass123"})
     token = r.json()["access_token"]
     return {"Authorization": f"Bearer {token}"}
 
@@ -46,11 +49,451 @@ def test_crud_debt_and_filter(client):
     assert all(x["debt_type"] == "owed_to" for x in r.json())
 
     # update
-    payload["amount"] = 150
-    r = client.put(f"/api/debts/{debt_id}", json=payload, headers=headers)
+    r = client.patch(f"/api/debts/{debt_id}", json={"amount": 150}, headers=headers)
     assert r.status_code == 200
     assert r.json()["amount"] == 150
 
     # delete
     r = client.delete(f"/api/debts/{debt_id}", headers=headers)
     assert r.status_code == 204
+
+
+def test_list_debts_keyset_pagination_and_filters(client):
+    client.post("/api/auth/register", json={"username": "pager", "password": "pagerpass"})
+    r = client.post("/api/auth/login", json={"username": "pager", "password": "pagerpass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    past = (datetime.utcnow() - timedelta(days=3)).isoformat()
+    future = (datetime.utcnow() + timedelta(days=3)).isoformat()
+    rows = [
+        ("Ali", "USD", past),
+        ("Alisher", "UZS", future),
+        ("Bobur", "USD", None),
+        ("Ali_", "UZS", past),
+        ("Dilshod", "UZS", future),
+    ]
+    created = []
+    for name, currency, due in rows:
+        r = client.post("/api/debts/", json={
+            "debt_type": "owed_to", "person_name": name, "amount": 10, "currency": currency, "due_date": due
+        }, headers=headers)
+        created.append(r.json()["id"])
+
+    # walk every page
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/api/debts/", params=params, headers=headers)
+        assert r.status_code == 200
+        assert len(r.json()) <= 2
+        seen += [x["id"] for x in r.json()]
+        cursor = r.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == list(reversed(created))
+
+    r = client.get("/api/debts/", params={"currency": "USD"}, headers=headers)
+    assert sorted(x["person_name"] for x in r.json()) == ["Ali", "Bobur"]
+
+    # prefix match treats "_" literally
+    r = client.get("/api/debts/", params={"person_name": "Ali_"}, headers=headers)
+    assert [x["person_name"] for x in r.json()] == ["Ali_"]
+    r = client.get("/api/debts/", params={"person_name": "Ali"}, headers=headers)
+    assert sorted(x["person_name"] for x in r.json()) == ["Ali", "Ali_", "Alisher"]
+
+    r = client.get("/api/debts/", params={"overdue": "true"}, headers=headers)
+    assert sorted(x["person_name"] for x in r.json()) == ["Ali", "Ali_"]
+
+    r = client.get("/api/debts/", params={"due_from": datetime.utcnow().isoformat()}, headers=headers)
+    assert sorted(x["person_name"] for x in r.json()) == ["Alisher", "Dilshod"]
+
+    r = client.get("/api/debts/", params={"cursor": "not-a-cursor"}, headers=headers)
+    assert r.status_code == 400
+
+
+def test_bulk_import_json_ndjson_and_csv(client, monkeypatch):
+    from routers import debts as debts_router
+
+    client.post("/api/auth/register", json={"username": "importer", "password": "importerpass"})
+    r = client.post("/api/auth/login", json={"username": "importer", "password": "importerpass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    monkeypatch.setattr(debts_router, "IMPORT_BATCH_SIZE", 2)
+
+    r = client.post("/api/debts/import", headers=headers, json=[
+        {"debt_type": "owed_to", "person_name": "A", "amount": 10},
+        {"debt_type": "owed_to", "person_name": "B", "amount": 20, "currency": "USD"},
+        {"debt_type": "sideways", "person_name": "C", "amount": 5},
+        {"debt_type": "owed_by", "person_name": "D", "amount": 7},
+    ])
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["imported"], body["failed"]) == (3, 1)
+    assert body["errors"][0]["row"] == 3
+
+    ndjson = "\n".join([
+        '{"debt_type": "owed_to", "person_name": "E", "amount": 1}',
+        '{not json',
+        '',
+        '{"debt_type": "owed_by", "amount": 2}',
+    ])
+    r = client.post("/api/debts/import", headers={**headers, "Content-Type": "application/x-ndjson"}, content=ndjson)
+    body = r.json()
+    assert (body["imported"], body["failed"]) == (1, 2)
+    assert [e["row"] for e in body["errors"]] == [2, 3]
+    assert body["errors"][1]["errors"] == ["person_name: Field required"]
+
+    csv_body = (
+        "debt_type,person_name,amount,currency,description\n"
+        'owed_to,F,100,,"first line\nsecond, line"\n'
+        "owed_by,G,abc,UZS,\n"
+    )
+    r = client.post("/api/debts/import", headers={**headers, "Content-Type": "text/csv"}, content=csv_body)
+    body = r.json()
+    assert (body["imported"], body["failed"]) == (1, 1)
+
+    r = client.get("/api/debts/", params={"person_name": "F"}, headers=headers)
+    assert r.json()[0]["description"] == "first line\nsecond, line"
+    assert r.json()[0]["currency"] == "UZS"
+
+    r = client.get("/api/monitoring/", headers=headers)
+    assert r.json()["summary"] == [
+        {"currency": "USD", "total_owed_to": 20, "total_owed_by": 0, "balance": 20},
+        {"currency": "UZS", "total_owed_to": 111, "total_owed_by": 7, "balance": 104},
+    ]
+
+    r = client.post("/api/debts/import", headers={**headers, "Content-Type": "text/plain"}, content="x")
+    assert r.status_code == 415
+
+
+def test_export_streams_ndjson_and_csv(client):
+    import csv, io, json
+
+    client.post("/api/auth/register", json={"username": "exporter", "password": "exporterpass"})
+    r = client.post("/api/auth/login", json={"username": "exporter", "password": "exporterpass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    client.post("/api/debts/import", headers=headers, json=[
+        {"debt_type": "owed_to", "person_name": f"P{i}", "amount": i, "description": "a, \"quoted\"\nnote"}
+        for i in range(5)
+    ])
+
+    r = client.get("/api/debts/export", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert sorted(row["person_name"] for row in rows) == [f"P{i}" for i in range(5)]
+    assert rows[0]["debt_type"] == "owed_to"
+
+    r = client.get("/api/debts/export", params={"format": "csv"}, headers=headers)
+    rows = list(csv.DictReader(io.StringIO(r.text)))
+    assert len(rows) == 5
+    assert rows[0]["description"] == "a, \"quoted\"\nnote"
+
+    assert client.get("/api/debts/export", params={"format": "xml"}, headers=headers).status_code == 422
+
+
+def test_export_memory_does_not_grow_with_rows(db):
+    import tracemalloc
+    import crud, debt_io, models, schemas
+
+    def peak_for(n):
+        user = models.User(username=f"export-mem-{n}", password_hash="x")
+        db.add(user)
+        db.commit()
+        debt = schemas.DebtCreate(debt_type="owed_by", person_name="Someone", amount=1, description="x" * 50)
+        for _ in range(0, n, 1000):
+            crud.bulk_create_debts(db, user.id, [debt] * 1000)
+
+        tracemalloc.start()
+        total = sum(len(chunk) for chunk in debt_io.stream_export(user.id, "ndjson", batch_size=500))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return total, peak
+
+    small_bytes, small_peak = peak_for(2_000)
+    big_bytes, big_peak = peak_for(20_000)
+    assert big_bytes > 9 * small_bytes
+    # 10x the rows (and output) must not need meaningfully more memory
+    assert big_peak < small_peak * 1.5
+
+
+def test_batch_operations_single_transaction(client):
+    client.post("/api/auth/register", json={"username": "batcher", "password": "batcherpass"})
+    r = client.post("/api/auth/login", json={"username": "batcher", "password": "batcherpass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    existing = [
+        client.post("/api/debts/", json={"debt_type": "owed_to", "person_name": n, "amount": 10}, headers=headers).json()["id"]
+        for n in ("X", "Y")
+    ]
+
+    r = client.post("/api/debts/batch", headers=headers, json={"operations": [
+        {"op": "create", "data": {"debt_type": "owed_by", "person_name": "New", "amount": 5}},
+        {"op": "update", "id": existing[0], "data": {"amount": 25, "currency": "USD"}},
+        {"op": "delete", "id": existing[1]},
+        {"op": "update", "id": existing[1], "data": {"amount": 1}},
+        {"op": "delete", "id": 999999},
+        {"op": "create", "data": {"debt_type": "nope", "person_name": "Bad", "amount": 1}},
+        {"op": "update", "data": {"amount": 1}},
+        {"op": "create", "data": {"debt_type": "owed_to", "person_name": "New2", "amount": 7}},
+    ]})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [x["status"] for x in results] == [
+        "created", "updated", "deleted", "not_found", "not_found", "invalid", "invalid", "created",
+    ]
+    assert results[0]["debt"]["person_name"] == "New" and results[0]["id"] == results[0]["debt"]["id"]
+    assert results[1]["debt"]["amount"] == 25 and results[1]["debt"]["currency"] == "USD"
+    assert results[7]["debt"]["person_name"] == "New2"
+
+    names = sorted(x["person_name"] for x in client.get("/api/debts/", headers=headers).json())
+    assert names == ["New", "New2", "X"]
+    r = client.get("/api/monitoring/", headers=headers)
+    assert r.json()["summary"] == [
+        {"currency": "USD", "total_owed_to": 25, "total_owed_by": 0, "balance": 25},
+        {"currency": "UZS", "total_owed_to": 7, "total_owed_by": 5, "balance": 2},
+    ]
+
+
+def test_decimal_amounts_are_exact(client):
+    client.post("/api/auth/register", json={"username": "cents", "password": "centspass"})
+    r = client.post("/api/auth/login", json={"username": "cents", "password": "centspass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    ids = []
+    for amount in (0.1, 0.2, "10.05"):
+        r = client.post("/api/debts/", json={"debt_type": "owed_to", "person_name": "C", "amount": amount, "currency": "USD"}, headers=headers)
+        assert r.status_code == 201
+        ids.append(r.json()["id"])
+    assert r.json()["amount"] == 10.05
+
+    # 0.1 + 0.2 + 10.05 summed as decimals, not floats
+    r = client.get("/api/monitoring/", headers=headers)
+    assert r.json()["summary"] == [{"currency": "USD", "total_owed_to": 10.35, "total_owed_by": 0, "balance": 10.35}]
+
+    # finer than the currency's minor unit is rejected, not truncated
+    r = client.post("/api/debts/", json={"debt_type": "owed_to", "person_name": "C", "amount": "1.5", "currency": "JPY"}, headers=headers)
+    assert r.status_code == 422
+    r = client.patch(f"/api/debts/{ids[0]}", json={"amount": "0.125"}, headers=headers)
+    assert r.status_code == 422
+    r = client.patch(f"/api/debts/{ids[0]}", json={"amount": "0.125", "currency": "KWD"}, headers=headers)
+    assert r.status_code == 200
+    assert r.json()["amount"] == 0.125
+
+    # in a batch only the offending operation is rejected, and it changes nothing
+    yen = client.post("/api/debts/", json={"debt_type": "owed_to", "person_name": "C", "amount": 5, "currency": "JPY"}, headers=headers).json()["id"]
+    r = client.post("/api/debts/batch", headers=headers, json={"operations": [
+        {"op": "update", "id": yen, "data": {"amount": 1.5}},
+        {"op": "update", "id": ids[1], "data": {"amount": "0.25"}},
+    ]})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [x["status"] for x in results] == ["invalid", "updated"]
+    assert results[0]["id"] == yen and "at most 0 decimal places" in results[0]["errors"][0]
+    amounts = {d["id"]: d["amount"] for d in client.get("/api/debts/", headers=headers).json()}
+    assert amounts[yen] == 5 and amounts[ids[1]] == 0.25
+
+
+def test_large_amounts_serialize_exactly():
+    from decimal import Decimal
+    import money
+
+    assert money.to_json_number(Decimal("10.0500")) == 10.05
+    assert money.to_json_number(Decimal("123456789012345678.0000")) == 123456789012345678
+    # a sum past what a double holds goes out as its exact decimal string
+    assert money.to_json_number(Decimal("99999999999999.9900")) == "99999999999999.99"
+
+
+def test_search_debts_ranked_and_paginated(client):
+    client.post("/api/auth/register", json={"username": "finder", "password": "finderpass"})
+    r = client.post("/api/auth/login", json={"username": "finder", "password": "finderpass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    rows = [
+        ("Alisher Navoiy", "kitob uchun"),
+        ("Bobur", "Alisher bilan birga tushlik"),
+        ("Dilshod", "telefon"),
+        ("Alisher Qodirov", None),
+    ]
+    ids = {}
+    for name, description in rows:
+        r = client.post("/api/debts/", json={
+            "debt_type": "owed_to", "person_name": name, "amount": 5, "description": description
+        }, headers=headers)
+        ids[name] = r.json()["id"]
+
+    r = client.get("/api/debts/search?q=alish", headers=headers)
+    assert r.status_code == 200
+    found = [d["person_name"] for d in r.json()]
+    # name matches outrank a match in the description only
+    assert set(found[:2]) == {"Alisher Navoiy", "Alisher Qodirov"}
+    assert found[2] == "Bobur"
+
+    r = client.get("/api/debts/search?q=alisher kitob", headers=headers)
+    assert [d["id"] for d in r.json()] == [ids["Alisher Navoiy"]]
+
+    # pages follow X-Next-Offset
+    r = client.get("/api/debts/search?q=alisher&limit=2", headers=headers)
+    assert len(r.json()) == 2 and r.headers["X-Next-Offset"] == "2"
+    r = client.get("/api/debts/search?q=alisher&limit=2&offset=2", headers=headers)
+    assert len(r.json()) == 1 and "X-Next-Offset" not in r.headers
+
+    # the index follows updates and deletes
+    client.patch(f"/api/debts/{ids['Dilshod']}", json={"description": "Alisher uchun telefon"}, headers=headers)
+    client.delete(f"/api/debts/{ids['Bobur']}", headers=headers)
+    r = client.get("/api/debts/search?q=alisher", headers=headers)
+    assert {d["person_name"] for d in r.json()} == {"Alisher Navoiy", "Alisher Qodirov", "Dilshod"}
+
+    # FTS syntax in the input is treated as plain words; other users' debts never show up
+    assert client.get('/api/debts/search?q=" OR *', headers=headers).json() == []
+    other = get_auth_header(client)
+    assert client.get("/api/debts/search?q=alisher", headers=other).json() == []
+
+def test_delta_sync_returns_only_changes(client):
+    client.post("/api/auth/register", json={"username": "syncuser", "password": "syncpass"})
+    r = client.post("/api/auth/login", json={"username": "syncuser", "password": "syncpass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    ids = [
+        client.post("/api/debts/", json={"debt_type": "owed_to", "person_name": f"S{i}", "amount": i + 1}, headers=headers).json()["id"]
+        for i in range(5)
+    ]
+
+    # full sync, two pages
+    r = client.get("/api/debts/sync", params={"limit": 3}, headers=headers)
+    assert r.status_code == 200
+    page = r.json()
+    assert [d["id"] for d in page["changed"]] == ids[:3]
+    assert page["deleted"] == [] and page["has_more"] is True
+    page = client.get("/api/debts/sync", params={"cursor": page["cursor"], "limit": 3}, headers=headers).json()
+    assert [d["id"] for d in page["changed"]] == ids[3:]
+    assert page["has_more"] is False
+    cursor = page["cursor"]
+
+    # nothing changed: nothing returned, same position
+    page = client.get("/api/debts/sync", params={"cursor": cursor}, headers=headers).json()
+    assert page == {"changed": [], "deleted": [], "cursor": cursor, "has_more": False}
+
+    client.patch(f"/api/debts/{ids[1]}", json={"amount": 42}, headers=headers)
+    client.delete(f"/api/debts/{ids[2]}", headers=headers)
+    client.post("/api/debts/batch", json={"operations": [
+        {"op": "create", "data": {"debt_type": "owed_by", "person_name": "S5", "amount": 6}},
+        {"op": "delete", "id": ids[4]},
+        {"op": "delete", "id": 999999},
+    ]}, headers=headers)
+    page = client.get("/api/debts/sync", params={"cursor": cursor}, headers=headers).json()
+    changed = page["changed"]
+    assert [d["id"] for d in changed][0] == ids[1]
+    assert changed[0]["amount"] == 42 and changed[0]["updated_at"] >= changed[0]["created_at"]
+    assert [d["person_name"] for d in changed[1:]] == ["S5"]
+    assert page["deleted"] == [ids[2], ids[4]]
+    assert changed[0]["version"] < changed[1]["version"]
+
+    # a change made mid-walk is picked up on the following pages
+    page = client.get("/api/debts/sync", params={"cursor": cursor, "limit": 1}, headers=headers).json()
+    assert [d["id"] for d in page["changed"]] == [ids[1]] and page["has_more"] is True
+    client.patch(f"/api/debts/{ids[0]}", json={"amount": 7}, headers=headers)
+    seen, deleted, cursor2 = [ids[1]], [], page["cursor"]
+    while True:
+        page = client.get("/api/debts/sync", params={"cursor": cursor2, "limit": 1}, headers=headers).json()
+        seen += [d["id"] for d in page["changed"]]
+        deleted += page["deleted"]
+        cursor2 = page["cursor"]
+        if not page["has_more"]:
+            break
+    assert seen[-1] == ids[0] and deleted == [ids[2], ids[4]]
+
+    assert client.get("/api/debts/sync", params={"cursor": "bogus"}, headers=headers).status_code == 400
+    # a GET /api/debts/ cursor is not a sync position
+    list_cursor = utils.encode_cursor(datetime.utcnow(), ids[0])
+    assert client.get("/api/debts/sync", params={"cursor": list_cursor}, headers=headers).status_code == 400
+
+
+def test_delta_sync_reused_id_is_not_also_deleted(client):
+    client.post("/api/auth/register", json={"username": "reuser", "password": "reuserpass"})
+    r = client.post("/api/auth/login", json={"username": "reuser", "password": "reuserpass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    body = {"debt_type": "owed_to", "person_name": "R", "amount": 1}
+
+    client.post("/api/debts/", json=body, headers=headers)
+    cursor = client.get("/api/debts/sync", headers=headers).json()["cursor"]
+    last = client.post("/api/debts/", json=body, headers=headers).json()["id"]
+    client.delete(f"/api/debts/{last}", headers=headers)
+    again = client.post("/api/debts/", json=dict(body, amount=2), headers=headers).json()["id"]
+
+    page = client.get("/api/debts/sync", params={"cursor": cursor}, headers=headers).json()
+    assert again in [d["id"] for d in page["changed"]]
+    assert again not in page["deleted"]
+    if again != last:  # id not reused (e.g. Postgres): the delete is reported as usual
+        assert page["deleted"] == [last]
+
+
+@pytest.mark.parametrize("first, second", [
+    ("update", "update"),
+    ("update", "delete"),
+    ("batch", "update"),
+    ("batch", "delete"),
+    ("rebuild", "update"),
+    ("rebuild", "delete"),
+])
+def test_concurrent_writes_keep_balances_exact(tmp_path, first, second):
+    import threading
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import sessionmaker
+    import crud, models, schemas
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'race.db'}", connect_args={"timeout": 10})
+    models.Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    with Session() as s:
+        user_id = crud.create_user(s, schemas.UserCreate(username="racer", password="x"), password_hash="x").id
+        debt_id = crud.create_debt(s, schemas.DebtCreate(debt_type="owed_to", person_name="R", amount=10), user_id).id
+        if first == "rebuild":
+            # drift for the rebuild to repair
+            s.execute(models.UserBalance.__table__.update().values(owed_to=99))
+            s.commit()
+
+    ops = {
+        "update": lambda s: crud.update_debt(s, debt_id, user_id, schemas.DebtUpdate(amount=20)),
+        "delete": lambda s: crud.delete_debt(s, debt_id, user_id),
+        "batch": lambda s: crud.apply_debt_batch(s, user_id, [("update", debt_id, schemas.DebtUpdate(amount=30))]),
+        "rebuild": lambda s: crud.rebuild_user_balances(s, user_id),
+    }
+    # both writers reach their first write together, then the second one commits before the
+    # first goes on: anything the first read before its first write is stale by then
+    barrier = threading.Barrier(2, timeout=5)
+    second_done = threading.Event()
+    racing = threading.local()
+
+    def hold(conn, cursor, statement, parameters, context, executemany):
+        if getattr(racing, "role", None) and not statement.lstrip().startswith(("SELECT", "BEGIN")):
+            role, racing.role = racing.role, None
+            barrier.wait()
+            if role == "first":
+                second_done.wait(5)
+
+    def run(role, op, errors):
+        racing.role = role
+        try:
+            with Session() as s:
+                ops[op](s)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            if role == "second":
+                second_done.set()
+
+    event.listen(engine, "before_cursor_execute", hold)
+    errors = []
+    threads = [threading.Thread(target=run, args=args + (errors,)) for args in (("first", first), ("second", second))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    event.remove(engine, "before_cursor_execute", hold)
+
+    assert not errors, errors
+    with Session() as s:
+        assert crud.rebuild_user_balances(s, user_id, dry_run=True) == []
+    engine.dispose()
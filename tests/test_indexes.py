@@ -0,0 +1,97 @@
+"""
+The debt list queries must be served by the user-scoped indexes created by
+the migrations. Each test runs crud.get_user_debts against a database built
+with `alembic upgrade head`, captures the SQL it sends and checks the
+EXPLAIN QUERY PLAN output for the expected index.
+"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import crud, schemas
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def migrated_session(tmp_path_factory):
+    url = f"sqlite:///{tmp_path_factory.mktemp('indexes') / 'migrated.db'}"
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+
+    engine = create_engine(url)
+    session = sessionmaker(bind=engine, expire_on_commit=False)()
+    user = crud.create_user(session, schemas.UserCreate(username="planner", password="x"), password_hash="x")
+    now = datetime.utcnow()
+    crud.bulk_create_debts(session, user.id, [
+        schemas.DebtCreate(
+            debt_type=("owed_to", "owed_by")[i % 2], person_name=f"p{i}", amount=i + 1,
+            currency=("UZS", "USD")[i % 2], due_date=now + timedelta(days=i - 10) if i % 3 else None,
+        )
+        for i in range(30)
+    ])
+    yield session, user.id
+    session.close()
+    engine.dispose()
+
+
+def query_plans(session, fn, *args, **kwargs) -> list:
+    """EXPLAIN QUERY PLAN of every SELECT that fn(session, ...) sends"""
+    captured = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    engine = session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        fn(session, *args, **kwargs)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    plans = []
+    with engine.connect() as conn:
+        for statement, parameters in captured:
+            rows = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+            plans.append("\n".join(row[-1] for row in rows))
+    return plans
+
+
+def query_plan(session, **filters) -> str:
+    return query_plans(session, crud.get_user_debts, **filters)[-1]
+
+
+@pytest.mark.parametrize("filters, index", [
+    ({}, "ix_debts_user_start_id"),
+    ({"after": (datetime.utcnow(), 10), "limit": 5}, "ix_debts_user_start_id"),
+    ({"debt_type": "owed_to"}, "ix_debts_user_type_start_id"),
+    ({"currency": "USD"}, "ix_debts_user_currency_start_id"),
+    ({"overdue": True}, "ix_debts_user_due_open"),
+    ({"due_from": datetime.utcnow(), "due_to": datetime.utcnow() + timedelta(days=7)}, "ix_debts_user_due_open"),
+])
+def test_debt_queries_use_user_scoped_index(migrated_session, filters, index):
+    session, user_id = migrated_session
+    plan = query_plan(session, user_id=user_id, **filters)
+    assert f"USING INDEX {index}" in plan or f"USING COVERING INDEX {index}" in plan, plan
+    # the default order comes straight off the (start_date desc, id desc) indexes
+    if index != "ix_debts_user_due_open":
+        assert "TEMP B-TREE" not in plan, plan
+
+
+def test_debt_changes_use_version_index(migrated_session):
+    session, user_id = migrated_session
+    version = crud.get_version_stamp(session, user_id).debts_version
+    _, changed, tombstones = query_plans(session, crud.get_debt_changes, user_id, after=(version - 1, 3), limit=10)
+    assert "USING INDEX ix_debts_user_version_id" in changed or "USING COVERING INDEX ix_debts_user_version_id" in changed, changed
+    # the (user_id, version, debt_id) primary key
+    assert "SEARCH debt_tombstones USING COVERING INDEX sqlite_autoindex_debt_tombstones" in tombstones, tombstones
+    for plan in (changed, tombstones):
+        assert "TEMP B-TREE" not in plan, plan
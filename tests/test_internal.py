@@ -0,0 +1,55 @@
+import database
+from sqlalchemy import create_engine
+from routers import internal
+
+
+def test_pool_endpoint(client, internal_headers):
+    r = client.get("/internal/pool", headers=internal_headers)
+    assert r.status_code == 200
+    assert "pool" in r.json()["sync"]
+
+
+def test_internal_endpoints_fail_closed(client, internal_headers, monkeypatch):
+    for path in ("/internal/pool", "/internal/caches", "/metrics"):
+        assert client.get(path).status_code == 403
+        assert client.get(path, headers={"X-Internal-Token": "wrong"}).status_code == 403
+    # no configured token: refused even with a header
+    monkeypatch.setattr(internal, "INTERNAL_API_TOKEN", None)
+    assert client.get("/metrics", headers=internal_headers).status_code == 403
+    assert client.get("/metrics", headers={"X-Internal-Token": ""}).status_code == 403
+
+
+def test_pool_status_counts_checkouts(tmp_path):
+    database.TimedQueuePool.stats.reset()
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    engine = create_engine(url, **dict(database.pool_options(url, database.TimedQueuePool), pool_size=2, max_overflow=1))
+
+    conns = [engine.connect() for _ in range(3)]
+    status = database.get_pool_status(engine)
+    assert status["pool"] == "TimedQueuePool"
+    assert status["checked_out"] == 3
+    assert status["overflow"] == 1
+    assert status["checkouts"] == 3
+
+    for c in conns:
+        c.close()
+    status = database.get_pool_status(engine)
+    assert status["checked_out"] == 0
+    assert status["idle"] == 2
+    engine.dispose()
+
+
+def test_metrics_endpoint(client, internal_headers):
+    client.get("/api/debts/")  # 401, still timed under its route template
+    client.get("/no-such-path")  # 404 outside every route
+
+    r = client.get("/metrics", headers=internal_headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = r.text
+    assert 'http_requests_total{method="GET",route="/api/debts/",status="401"}' in body
+    assert 'route="<unmatched>"' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/api/debts/",le="+Inf"}' in body
+    assert "http_requests_in_flight 1" in body  # the scrape itself
+    assert "# TYPE db_pool_checked_out gauge" in body  # StaticPool in tests reports no occupancy
+    assert 'cache_hit_ratio{cache="jwt"}' in body
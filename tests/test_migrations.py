@@ -0,0 +1,39 @@
+import os
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine
+
+import models, search
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic_config(url):
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def test_migrations_match_models(tmp_path):
+    # the app no longer calls create_all, so `alembic upgrade head` must build exactly the mapped schema
+    url = f"sqlite:///{tmp_path / 'schema.db'}"
+    command.upgrade(alembic_config(url), "head")
+
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        context = MigrationContext.configure(conn, opts={"include_name": search.include_name})
+        diff = compare_metadata(context, models.Base.metadata)
+    engine.dispose()
+    assert diff == []
+
+
+def test_migrations_downgrade_to_base(tmp_path):
+    url = f"sqlite:///{tmp_path / 'roundtrip.db'}"
+    config = alembic_config(url)
+    command.upgrade(config, "head")
+    command.downgrade(config, "base")
+    command.upgrade(config, "head")
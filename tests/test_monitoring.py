@@ -1,12 +1,19 @@
+import logging
+from decimal import Decimal
+
+import crud, models
+
+
 def test_monitoring(client):
     # create user and some debts
     client.post("/api/auth/register", json={
+        "username":"monuser",
         "first_name":"Mon",
         "last_name":"User",
         "email":"mon@example.com",
         "password":"monpass"
     })
-    r = client.post("/api/auth/token", data={"username":"mon@example.com", "password":"monpass"})
+    r = client.post("/api/auth/login", json={"username":"monuser", "password":"monpass"})
     token = r.json()["access_token"]
     headers = {"Authorization": f"Bearer {token}"}
 
@@ -19,3 +26,211 @@ def test_monitoring(client):
     data = r.json()
     assert "summary" in data
     assert any(item["currency"] == "UZS" for item in data["summary"])
+
+
+def test_monitoring_totals_per_currency(client):
+    client.post("/api/auth/register", json={"username": "totals", "password": "totalspass"})
+    r = client.post("/api/auth/login", json={"username": "totals", "password": "totalspass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    debts = [
+        ("owed_to", 50, "UZS"),
+        ("owed_by", 20, "UZS"),
+        ("owed_to", 30, "UZS"),
+        ("owed_by", 7, "USD"),
+    ]
+    for debt_type, amount, currency in debts:
+        r = client.post("/api/debts/", json={
+            "debt_type": debt_type, "person_name": "P", "amount": amount, "currency": currency
+        }, headers=headers)
+        assert r.status_code == 201
+
+    r = client.get("/api/monitoring/", headers=headers)
+    assert r.status_code == 200
+    assert r.json()["summary"] == [
+        {"currency": "USD", "total_owed_to": 0, "total_owed_by": 7, "balance": -7},
+        {"currency": "UZS", "total_owed_to": 80, "total_owed_by": 20, "balance": 60},
+    ]
+
+
+def test_balances_follow_updates_and_deletes(client, db):
+    client.post("/api/auth/register", json={"username": "balances", "password": "balancespass"})
+    r = client.post("/api/auth/login", json={"username": "balances", "password": "balancespass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    r = client.post("/api/debts/", json={"debt_type": "owed_to", "person_name": "A", "amount": 100}, headers=headers)
+    first = r.json()["id"]
+    r = client.post("/api/debts/", json={"debt_type": "owed_by", "person_name": "B", "amount": 40}, headers=headers)
+    second = r.json()["id"]
+
+    # move the first debt to another currency and flip the second one
+    client.patch(f"/api/debts/{first}", json={"currency": "USD", "amount": 90}, headers=headers)
+    client.patch(f"/api/debts/{second}", json={"debt_type": "owed_to"}, headers=headers)
+    r = client.get("/api/monitoring/", headers=headers)
+    assert r.json()["summary"] == [
+        {"currency": "USD", "total_owed_to": 90, "total_owed_by": 0, "balance": 90},
+        {"currency": "UZS", "total_owed_to": 40, "total_owed_by": 0, "balance": 40},
+    ]
+
+    client.delete(f"/api/debts/{first}", headers=headers)
+    r = client.get("/api/monitoring/", headers=headers)
+    assert r.json()["summary"] == [
+        {"currency": "UZS", "total_owed_to": 40, "total_owed_by": 0, "balance": 40},
+    ]
+
+    user_id = db.query(models.User).filter_by(username="balances").one().id
+    assert crud.rebuild_user_balances(db, user_id, dry_run=True) == []
+
+
+def test_rebuild_balances_reports_drift(db):
+    user = models.User(username="drift", password_hash="x")
+    db.add(user)
+    db.flush()
+    # bypass crud so the balance table is not maintained
+    db.add(models.Debt(user_id=user.id, debt_type=models.DebtType.owed_to, person_name="A", amount=5, currency="EUR"))
+    db.commit()
+
+    drift = crud.rebuild_user_balances(db, user.id)
+    assert drift == [{
+        "user_id": user.id,
+        "currency": "EUR",
+        "expected": {"owed_to": 5, "owed_by": 0, "debt_count": 1},
+        "actual": {"owed_to": 0, "owed_by": 0, "debt_count": 0},
+    }]
+    assert crud.rebuild_user_balances(db, user.id) == []
+    assert crud.get_monitoring_summary(db, user.id) == [
+        {"currency": "EUR", "total_owed_to": 5, "total_owed_by": 0, "balance": 5},
+    ]
+
+
+def test_monitoring_consolidated_total(client, monkeypatch):
+    import rates
+    rates.set_rates(rates.RateTable("USD", {"UZS": Decimal(12500), "EUR": Decimal("0.8")}, "test-v1"))
+
+    client.post("/api/auth/register", json={"username": "fx", "password": "fxpassword"})
+    r = client.post("/api/auth/login", json={"username": "fx", "password": "fxpassword"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    client.patch("/api/settings/", json={"default_currency": "USD"}, headers=headers)
+
+    for debt_type, amount, currency in [
+        ("owed_to", 25000, "UZS"),
+        ("owed_by", 8, "EUR"),
+        ("owed_to", 3, "USD"),
+        ("owed_to", 1, "XYZ"),
+    ]:
+        client.post("/api/debts/", json={
+            "debt_type": debt_type, "person_name": "P", "amount": amount, "currency": currency
+        }, headers=headers)
+
+    # one rate lookup per currency row, not per debt
+    calls = []
+    real_rate = rates.RateTable.rate
+    monkeypatch.setattr(rates.RateTable, "rate", lambda self, *a: calls.append(a) or real_rate(self, *a))
+
+    data = client.get("/api/monitoring/", headers=headers).json()
+    assert len(data["summary"]) == 4
+    assert data["consolidated"] == {
+        "currency": "USD",
+        "total_owed_to": 5.0,  # 25000 UZS + 3 USD
+        "total_owed_by": 10.0,  # 8 EUR
+        "balance": -5.0,
+        "rates_version": "test-v1",
+        "missing_rates": ["XYZ"],
+    }
+    assert len(calls) == 4
+
+
+def test_rates_file_reload(tmp_path, monkeypatch, caplog):
+    import rates
+    path = tmp_path / "rates.json"
+    path.write_text('{"base": "USD", "rates": {"UZS": 12000}}')
+    monkeypatch.setattr(rates, "EXCHANGE_RATES_FILE", str(path))
+    rates.invalidate()
+    first = rates.get_rates()
+    assert first.rate("USD", "UZS") == 12000
+
+    # within the TTL the cached table is served; a bad file later keeps the last good one
+    path.write_text('{"base": "USD", "rates": {"UZS": 13000}}')
+    assert rates.get_rates() is first
+    rates.invalidate()
+    second = rates.get_rates()
+    assert second.rate("UZS", "USD") == Decimal(1) / 13000
+    assert second.version != first.version
+
+    path.write_text("not json")
+    rates.invalidate()
+    with caplog.at_level(logging.WARNING, logger="debtmanager.rates"):
+        assert rates.get_rates() is second
+    assert [r.levelname for r in caplog.records if r.name == "debtmanager.rates"] == ["WARNING"]
+    assert second.version in caplog.text
+
+
+def test_counterparty_rollups(client, db, count_queries):
+    import rates
+    rates.set_rates(rates.RateTable("USD", {"UZS": Decimal(10000)}, "test-cp"))
+
+    client.post("/api/auth/register", json={"username": "ledger", "password": "ledgerpass"})
+    r = client.post("/api/auth/login", json={"username": "ledger", "password": "ledgerpass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    client.patch("/api/settings/", json={"default_currency": "USD"}, headers=headers)
+
+    for person, debt_type, amount, currency in [
+        ("Ali", "owed_to", 100, "USD"),
+        ("Ali", "owed_by", 30, "USD"),
+        ("Ali", "owed_to", 50000, "UZS"),  # 5 USD
+        ("Vali", "owed_by", 200, "USD"),
+        ("Soli", "owed_to", 10000, "UZS"),  # 1 USD
+    ]:
+        client.post("/api/debts/", json={
+            "debt_type": debt_type, "person_name": person, "amount": amount, "currency": currency
+        }, headers=headers)
+
+    with count_queries() as statements:
+        r = client.get("/api/monitoring/counterparties", headers=headers)
+    assert r.status_code == 200
+    assert len(statements) == 1
+    data = r.json()
+    # exposure = owed_to + owed_by in the default currency
+    assert [(p["person_name"], p["exposure"]) for p in data] == [("Vali", 200), ("Ali", 135), ("Soli", 1)]
+
+    ali = data[1]
+    assert ali["debt_count"] == 3
+    assert ali["currencies"] == [
+        {"currency": "USD", "total_owed_to": 100, "total_owed_by": 30, "balance": 70, "debt_count": 2},
+        {"currency": "UZS", "total_owed_to": 50000, "total_owed_by": 0, "balance": 50000, "debt_count": 1},
+    ]
+    assert ali["consolidated"]["balance"] == 75
+    assert ali["consolidated"]["currency"] == "USD"
+
+    # pages are over people, not (person, currency) rows
+    r = client.get("/api/monitoring/counterparties?limit=1&offset=1", headers=headers)
+    assert [p["person_name"] for p in r.json()] == ["Ali"]
+    assert len(r.json()[0]["currencies"]) == 2
+    assert r.headers["X-Next-Offset"] == "2"
+    r = client.get("/api/monitoring/counterparties?limit=1&offset=2", headers=headers)
+    assert "X-Next-Offset" not in r.headers
+
+    r = client.get("/api/monitoring/counterparties?currency=UZS", headers=headers)
+    assert [p["person_name"] for p in r.json()] == ["Ali", "Soli"]
+
+    r = client.get("/api/monitoring/counterparties/Ali", headers=headers)
+    assert r.json()["consolidated"]["total_owed_to"] == 105
+    assert client.get("/api/monitoring/counterparties/Nobody", headers=headers).status_code == 404
+
+    # unrated currencies order at face value and never show a converted exposure of 0
+    client.post("/api/debts/", json={"debt_type": "owed_to", "person_name": "A/B", "amount": 50, "currency": "XYZ"}, headers=headers)
+    data = client.get("/api/monitoring/counterparties", headers=headers).json()
+    assert [(p["person_name"], p["exposure"]) for p in data] == [("Vali", 200), ("Ali", 135), ("A/B", None), ("Soli", 1)]
+    assert data[2]["consolidated"]["missing_rates"] == ["XYZ"]
+    r = client.get("/api/monitoring/counterparties/A%2FB", headers=headers)
+    assert r.status_code == 200 and r.json()["currencies"][0]["total_owed_to"] == 50
+
+    # rows without a currency count as UZS in both the grouping and the filter
+    db.add(models.Debt(
+        user_id=crud.get_user_by_username(db, "ledger").id, debt_type=models.DebtType.owed_by,
+        person_name="Soli", amount=Decimal(20000), currency=None,
+    ))
+    db.commit()
+    r = client.get("/api/monitoring/counterparties?currency=UZS", headers=headers)
+    soli = next(p for p in r.json() if p["person_name"] == "Soli")
+    assert soli["currencies"] == [{"currency": "UZS", "total_owed_to": 10000, "total_owed_by": 20000, "balance": -10000, "debt_count": 2}]
@@ -0,0 +1,51 @@
+import json
+import logging
+
+import profiling
+
+
+def test_server_timing_and_slow_query_plan(client, caplog, monkeypatch):
+    client.post("/api/auth/register", json={"username": "profiled", "password": "profiledpass"})
+    r = client.post("/api/auth/login", json={"username": "profiled", "password": "profiledpass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    monkeypatch.setattr(profiling, "SLOW_QUERY_MS", 0)
+    monkeypatch.setattr(profiling, "DEBUG", True)
+    monkeypatch.setattr(profiling.logger, "propagate", True)
+    with caplog.at_level(logging.INFO, logger="debtmanager.sql"):
+        r = client.get("/api/debts/", headers=headers)
+    assert r.status_code == 200
+
+    timing = r.headers["Server-Timing"]
+    assert timing.startswith("db;dur=")
+
+    entries = [json.loads(rec.getMessage()) for rec in caplog.records if rec.name == "debtmanager.sql"]
+    request = next(e for e in entries if e["event"] == "request" and e["path"] == "/api/debts/")
+    assert request["status"] == 200 and request["db_queries"] >= 1
+    assert f'desc="{request["db_queries"]} queries"' in timing
+    assert request["slowest"][0]["sql"].startswith("SELECT")
+    plans = [e["plan"] for e in entries if e["event"] == "slow_query"]
+    assert any("ix_debts_user_start_id" in plan for plan in plans)
+
+
+def test_failed_statement_does_not_skew_timings():
+    from sqlalchemy import create_engine, exc, text
+
+    profiling.install()
+    engine = create_engine("sqlite://")
+    profile = profiling.RequestProfile()
+    token = profiling._current.set(profile)
+    try:
+        with engine.connect() as conn:
+            for _ in range(3):
+                try:
+                    conn.execute(text("SELECT * FROM no_such_table"))
+                except exc.OperationalError:
+                    pass
+            conn.execute(text("SELECT 1"))
+            assert not conn.info  # nothing kept per connection
+    finally:
+        profiling._current.reset(token)
+        engine.dispose()
+    assert profile.count == 1
+    assert profile.slowest[0][1] == "SELECT 1"
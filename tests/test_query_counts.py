@@ -0,0 +1,90 @@
+"""
+Statement budgets per endpoint. A failure here means an endpoint started
+issuing more SQL than before; raise the budget only on purpose.
+"""
+import pytest
+
+# (method, path, json) -> max statements, with a warm auth cache
+# writes include the version stamp bump, reads the version stamp lookup (see conditional.py)
+BUDGETS = [
+    ("post", "/api/debts/", {"debt_type": "owed_to", "person_name": "Q", "amount": 1}, 3),
+    ("patch", "/api/debts/{id}", {"amount": 2}, 4),
+    ("get", "/api/debts/", None, 2),
+    ("get", "/api/monitoring/", None, 2),
+    ("get", "/api/settings/", None, 2),
+    ("patch", "/api/settings/", {"theme": "dark"}, 3),
+    ("delete", "/api/debts/{id}", None, 5),  # +1 for the tombstone
+]
+
+
+@pytest.fixture(scope="module")
+def auth_headers(client):
+    client.post("/api/auth/register", json={"username": "counted", "password": "countedpass"})
+    r = client.post("/api/auth/login", json={"username": "counted", "password": "countedpass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    client.get("/api/settings/", headers=headers)  # warm the authenticated-user cache
+    return headers
+
+
+def test_register_statement_budget(client, count_queries):
+    with count_queries() as statements:
+        r = client.post("/api/auth/register", json={"username": "counted-new", "email": "cn@example.com", "password": "pw"})
+    assert r.status_code == 201
+    # conflict check, INSERT users, INSERT settings
+    assert len(statements) <= 3, statements
+
+    with count_queries() as statements:
+        r = client.post("/api/auth/register", json={"username": "other", "email": "cn@example.com", "password": "pw"})
+    assert r.status_code == 400
+    assert r.json()["detail"] == "Email already registered"
+    assert len(statements) == 1, statements
+
+
+def test_login_statement_budget(client, count_queries):
+    client.post("/api/auth/register", json={"username": "counted-login", "password": "pw"})
+    with count_queries() as statements:
+        r = client.post("/api/auth/login", json={"username": "counted-login", "password": "pw"})
+    assert r.status_code == 200
+    assert len(statements) <= 1, statements
+
+
+def test_endpoint_statement_budgets(client, auth_headers, count_queries):
+    debt_id = None
+    for method, path, body, budget in BUDGETS:
+        url = path.format(id=debt_id)
+        with count_queries() as statements:
+            r = getattr(client, method)(url, headers=auth_headers, **({"json": body} if body else {}))
+        assert r.status_code < 300, (url, r.text)
+        if method == "post":
+            debt_id = r.json()["id"]
+        assert len(statements) <= budget, f"{method.upper()} {path}: {len(statements)} > {budget}\n" + "\n".join(statements)
+
+
+@pytest.mark.parametrize("path", ["/api/debts/", "/api/monitoring/", "/api/settings/"])
+def test_not_modified_statement_budget(client, auth_headers, count_queries, path):
+    etag = client.get(path, headers=auth_headers).headers["ETag"]
+    with count_queries() as statements:
+        r = client.get(path, headers={**auth_headers, "If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    # only the version stamp lookup on users
+    assert len(statements) == 1, statements
+    assert "debts" not in statements[0].split("FROM", 1)[1], statements
+
+
+def test_debt_writes_lock_users_before_balances(client, auth_headers, count_queries):
+    # one lock order for every write path (users, then user_balances, then debts) so writers can't deadlock
+    debt_id = client.post("/api/debts/", json={"debt_type": "owed_to", "person_name": "L", "amount": 1}, headers=auth_headers).json()["id"]
+    writes = [
+        ("post", "/api/debts/", {"debt_type": "owed_to", "person_name": "L", "amount": 1}),
+        ("patch", f"/api/debts/{debt_id}", {"amount": 3}),
+        ("post", "/api/debts/batch", {"operations": [{"op": "update", "id": debt_id, "data": {"amount": 4}}]}),
+        ("delete", f"/api/debts/{debt_id}", None),
+    ]
+    for method, url, body in writes:
+        with count_queries() as statements:
+            getattr(client, method)(url, headers=auth_headers, **({"json": body} if body else {}))
+        lock = next(i for i, s in enumerate(statements) if not s.startswith("SELECT"))
+        assert statements[lock].startswith("UPDATE users "), (url, statements)
+        # the debts a write starts from are read under that lock, never before it
+        assert not any("FROM debts" in s for s in statements[:lock]), (url, statements)
@@ -0,0 +1,102 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import crud, database, models, reminders, schemas
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_settings_schedule_next_reminder(client):
+    client.post("/api/auth/register", json={"username": "remind", "password": "remindpass"})
+    r = client.post("/api/auth/login", json={"username": "remind", "password": "remindpass"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    r = client.patch("/api/settings/", json={"reminder_enabled": True, "reminder_time": "2024-01-01T09:30:00"}, headers=headers)
+    nxt = datetime.fromisoformat(r.json()["next_reminder_at"])
+    assert (nxt.hour, nxt.minute) == (9, 30)
+    assert datetime.utcnow() < nxt <= datetime.utcnow() + timedelta(days=1)
+
+    r = client.patch("/api/settings/", json={"notifications_enabled": False}, headers=headers)
+    assert r.json()["next_reminder_at"] is None
+
+
+@pytest.fixture
+def reminder_db(tmp_path, monkeypatch):
+    # a file database: the scheduler's worker threads each open their own session
+    url = f"sqlite:///{tmp_path / 'reminders.db'}"
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
+    engine = create_engine(url)
+    Session = sessionmaker(bind=engine, expire_on_commit=False)
+    monkeypatch.setattr(database, "SessionLocal", Session)
+    yield Session
+    engine.dispose()
+
+
+def make_user(db, name, reminder_at=None, debts=()):
+    user = crud.create_user(db, schemas.UserCreate(username=name, password="x"), password_hash="x")
+    if reminder_at:
+        crud.upsert_setting(db, user.id, schemas.SettingUpdate(reminder_enabled=True, reminder_time=reminder_at))
+    for person, due in debts:
+        crud.create_debt(db, schemas.DebtCreate(debt_type="owed_to", person_name=person, amount=10, due_date=due), user.id)
+    return user
+
+
+def test_run_due_reminders_sends_once(reminder_db):
+    now = datetime.utcnow()
+    with reminder_db() as db:
+        alice = make_user(db, "alice", now + timedelta(hours=1), [
+            ("late", now - timedelta(days=2)),
+            ("soon", now + timedelta(hours=5)),
+            ("later", now + timedelta(days=10)),
+            ("open", None),
+        ])
+        make_user(db, "bob", now + timedelta(hours=1))  # due, but nothing to remind about
+        make_user(db, "carol", None, [("late", now - timedelta(days=1))])  # reminders off
+        scheduled = crud.get_setting(db, alice.id).next_reminder_at
+
+    assert reminders.run_due_reminders(now=now, sink=reminders.QueueSink()) == 0  # not due yet
+    run_at = scheduled + timedelta(minutes=1)
+    sink = reminders.QueueSink()
+    assert reminders.run_due_reminders(now=run_at, sink=sink, batch_size=1, workers=2) == 1
+
+    event = sink.queue.get_nowait()
+    assert event["user_id"] == alice.id
+    assert event["scheduled_for"] == scheduled.isoformat()
+    assert [d["person_name"] for d in event["overdue"]] == ["late"]
+    assert [d["person_name"] for d in event["due_soon"]] == ["soon"]
+    assert sink.queue.empty()
+
+    with reminder_db() as db:
+        deliveries = db.query(models.ReminderDelivery).order_by(models.ReminderDelivery.user_id).all()
+        assert [(d.user_id, d.scheduled_for) for d in deliveries][0] == (alice.id, scheduled)
+        assert len(deliveries) == 2  # bob's occurrence is consumed even without debts
+        setting = crud.get_setting(db, alice.id)
+        assert setting.next_reminder_at == scheduled + timedelta(days=1)
+
+        # simulate a restart that lost the advanced schedule: the delivery row still blocks a resend
+        setting.next_reminder_at = scheduled
+        db.commit()
+
+    assert reminders.run_due_reminders(now=run_at, sink=sink) == 0
+    assert sink.queue.empty()
+
+
+def test_due_settings_query_uses_partial_index(reminder_db):
+    with reminder_db() as db:
+        conn = db.connection()
+        stmt = db.query(models.Setting).filter(
+            models.Setting.next_reminder_at.isnot(None), models.Setting.next_reminder_at <= datetime.utcnow()
+        ).order_by(models.Setting.next_reminder_at, models.Setting.user_id).limit(10).statement
+        compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+        plan = " ".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}").fetchall())
+    assert "ix_settings_next_reminder_at" in plan, plan
+    assert "TEMP B-TREE" not in plan, plan
@@ -1,10 +1,14 @@
 from passlib.context import CryptContext
 from datetime import datetime, timedelta
+from fastapi import HTTPException, status
 from jose import jwt
 from typing import Optional, Tuple
+import base64
+import hashlib
 import os
 import secrets
 from dotenv import load_dotenv
+import cache
 
 load_dotenv()
 
@@ -14,11 +18,39 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", 7))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing policy. The first scheme hashes new passwords; the others are
+# only accepted for verification and get rehashed on the next successful login.
+PASSWORD_SCHEMES = [s.strip() for s in os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",") if s.strip()]
+# bcrypt cost factor; every +1 doubles the time per hash/verify
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 2))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 19456))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 1))
+
+def build_pwd_context(schemes=None) -> CryptContext:
+    schemes = schemes or PASSWORD_SCHEMES
+    settings = {}
+    if "bcrypt" in schemes:
+        # min == max so hashes made with any other cost factor are flagged for rehash
+        settings.update(bcrypt__rounds=BCRYPT_ROUNDS, bcrypt__min_rounds=BCRYPT_ROUNDS, bcrypt__max_rounds=BCRYPT_ROUNDS)
+    if "argon2" in schemes:
+        # needs argon2-cffi
+        settings.update(
+            argon2__time_cost=ARGON2_TIME_COST,
+            argon2__memory_cost=ARGON2_MEMORY_COST,
+            argon2__parallelism=ARGON2_PARALLELISM,
+        )
+    return CryptContext(schemes=schemes, deprecated="auto", **settings)
+
+pwd_context = build_pwd_context()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a replacement hash if the stored one is outdated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -60,10 +92,16 @@ def create_tokens(data: dict) -> Tuple[str, str]:
 
 def verify_token(token: str, is_refresh: bool = False) -> dict:
     """Verify JWT token and return payload if valid"""
+    if not is_refresh:
+        # access tokens are replayed on every request for their whole lifetime
+        key = hashlib.sha256(token.encode()).digest()
+        payload = cache.token_cache.get(key)
+        if payload is not None:
+            return dict(payload)
+
     secret_key = REFRESH_SECRET_KEY if is_refresh else SECRET_KEY
     try:
         payload = jwt.decode(token, secret_key, algorithms=[ALGORITHM])
-        return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -76,3 +114,37 @@ def verify_token(token: str, is_refresh: bool = False) -> dict:
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    if not is_refresh and isinstance(payload.get("exp"), (int, float)):
+        cache.token_cache.set(key, dict(payload), expires_at=payload["exp"])
+    return payload
+
+def encode_cursor(start_date: datetime, debt_id: int) -> str:
+    """Encode a (start_date, id) keyset position as an opaque URL-safe cursor"""
+    raw = f"{start_date.isoformat()}|{debt_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        start, debt_id = raw.split("|", 1)
+        return datetime.fromisoformat(start), int(debt_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+def encode_sync_cursor(version: int, debt_id: Optional[int] = None) -> str:
+    """Encode a delta sync (version, id) position; an id of None means the whole version was read"""
+    raw = f"sync|{version}|{'' if debt_id is None else debt_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_sync_cursor(cursor: str) -> Tuple[int, Optional[int]]:
+    """Decode a cursor produced by encode_sync_cursor; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        kind, version, debt_id = raw.split("|")
+        if kind != "sync":
+            raise ValueError(kind)
+        return int(version), int(debt_id) if debt_id else None
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e